@@ -0,0 +1,230 @@
+import os
+import re
+import copy
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Optional
+import numpy as np
+
+# Answers are reused for identical or near-identical questions
+ANSWER_CACHE_TTL = int(os.environ.get("ANSWER_CACHE_TTL", str(24 * 3600)))  # Seconds
+ANSWER_CACHE_CAPACITY = int(os.environ.get("ANSWER_CACHE_CAPACITY", "2000"))
+ANSWER_CACHE_SIMILARITY = float(os.environ.get("ANSWER_CACHE_SIMILARITY", "0.92"))  # Cosine similarity for a semantic hit
+# Follow-up questions depend on the conversation, so by default they skip the cache
+ANSWER_CACHE_WITH_HISTORY = os.environ.get("ANSWER_CACHE_WITH_HISTORY", "0") == "1"
+EMBEDDING_DIMENSION = 384
+
+# Spoken and typed forms of the same arithmetic should share a key. Signs and
+# decimal points become words too, or "-3" and "3.5" would lose them with the punctuation.
+QUERY_REPLACEMENTS = [
+    (re.compile(r"(?<=\d),(?=\d{3}\b)"), ""),
+    (re.compile(r"(?<=\d)\.(?=\d)"), " point "),
+    (re.compile(r"\+"), " plus "),
+    (re.compile(r"(?<=[\d)])\s*-\s*(?=[-(]?\d)"), " minus "),
+    (re.compile(r"-(?=\(?\d)"), " negative "),
+    (re.compile(r"\s-\s"), " minus "),
+    (re.compile(r"[*×]"), " times "),
+    (re.compile(r"[/÷]"), " divided by "),
+    (re.compile(r"\^"), " to the power of "),
+    (re.compile(r"%"), " percent "),
+    # Comparisons before "=", which they may contain
+    (re.compile(r">=|≥"), " greater than or equal to "),
+    (re.compile(r"<=|≤"), " less than or equal to "),
+    (re.compile(r"!=|≠"), " not equal to "),
+    (re.compile(r">"), " greater than "),
+    (re.compile(r"<"), " less than "),
+    (re.compile(r"="), " equals "),
+]
+# Numbers and operator words a semantic hit must share, in order
+MATH_TERMS = re.compile(
+    r"\b(?:\d+|plus|minus|negative|times|divided by|point|power|percent|equals|"
+    r"greater than or equal to|less than or equal to|greater than|less than|not equal to)\b"
+)
+
+
+def normalize_query(text: str) -> str:
+    """
+    Lowercase, spell out arithmetic and comparison operators and drop
+    punctuation and filler whitespace.
+
+    >>> normalize_query("What is 3+4?")
+    'what is 3 plus 4'
+    >>> normalize_query("what is -3.5 * 2")
+    'what is negative 3 point 5 times 2'
+    >>> normalize_query("Is 5 > 3?"), normalize_query("Is 5 < 3?")
+    ('is 5 greater than 3', 'is 5 less than 3')
+    >>> normalize_query("is 5 >= 3"), normalize_query("is 5 ≤ 3")
+    ('is 5 greater than or equal to 3', 'is 5 less than or equal to 3')
+    """
+    normalized = str(text).lower()
+    for pattern, replacement in QUERY_REPLACEMENTS:
+        normalized = pattern.sub(replacement, normalized)
+    normalized = re.sub(r"[^a-z0-9\s]", " ", normalized)
+    return re.sub(r"\s+", " ", normalized).strip()
+
+
+def query_math_terms(normalized_query: str) -> list:
+    """
+    Numbers and operators of a question, in order; embeddings barely tell
+    "3 plus 4" from "3 plus 5" or "3 minus 4".
+
+    >>> query_math_terms(normalize_query("Is 5 > 3?"))
+    ['5', 'greater than', '3']
+    """
+    return MATH_TERMS.findall(normalized_query)
+
+
+@dataclass
+class AnswerCacheEntry:
+    query: str
+    payload: dict
+    slot: int
+    created: float
+
+
+class AnswerCache:
+    """
+    Cache of structured tutor answers, in front of the OpenRouter call.
+
+    Lookups try the hash of the normalized question first and then the
+    nearest cached question by MiniLM embedding, accepting it above
+    ANSWER_CACHE_SIMILARITY if it has the same numbers and operators. Embeddings live
+    in one preallocated matrix so the nearest-neighbour search is a single
+    matrix-vector product. Entries expire after ANSWER_CACHE_TTL, the least
+    recently used are evicted past ANSWER_CACHE_CAPACITY, and everything is
+    dropped when the RAG corpus version changes since answers may depend on
+    the retrieved documents.
+    """
+
+    def __init__(self, capacity: int = ANSWER_CACHE_CAPACITY, ttl: int = ANSWER_CACHE_TTL,
+                 similarity_threshold: float = ANSWER_CACHE_SIMILARITY):
+        self.capacity = capacity
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+        self.entries: "OrderedDict[str, AnswerCacheEntry]" = OrderedDict()
+        self.embeddings = np.zeros((capacity, EMBEDDING_DIMENSION), dtype=np.float32)
+        # Key stored in each embedding row, None for free rows
+        self.slot_keys = [None] * capacity
+        self.free_slots = list(range(capacity - 1, -1, -1))
+        self.corpus_version = None
+        self.lock = threading.Lock()
+        self.stats = {"exact_hits": 0, "semantic_hits": 0, "misses": 0, "invalidations": 0}
+
+    @staticmethod
+    def _key(normalized_query: str) -> str:
+        return hashlib.sha256(normalized_query.encode("utf-8")).hexdigest()
+
+    def _remove(self, key: str) -> None:
+        entry = self.entries.pop(key)
+        self.slot_keys[entry.slot] = None
+        self.embeddings[entry.slot] = 0
+        self.free_slots.append(entry.slot)
+
+    def _check_corpus_version(self, corpus_version: int) -> None:
+        if corpus_version != self.corpus_version:
+            if self.entries:
+                print(f"RAG corpus changed, dropping {len(self.entries)} cached answers")
+                self.stats["invalidations"] += 1
+            for key in list(self.entries):
+                self._remove(key)
+            self.corpus_version = corpus_version
+
+    def _hit(self, key: str, question: str) -> Optional[dict]:
+        entry = self.entries[key]
+        if time.time() - entry.created > self.ttl:
+            self._remove(key)
+            return None
+        self.entries.move_to_end(key)
+        payload = copy.deepcopy(entry.payload)
+        payload["question"] = question
+        return payload
+
+    def get(self, question: str, corpus_version: int, embed: Callable[[str], np.ndarray]) -> Optional[dict]:
+        """
+        Return a copy of the cached answer for the question, or None.
+
+        `embed` maps text to a normalized embedding; it's only called when
+        there is no exact match.
+        """
+        normalized = normalize_query(question)
+        key = self._key(normalized)
+        with self.lock:
+            self._check_corpus_version(corpus_version)
+            if key in self.entries:
+                payload = self._hit(key, question)
+                if payload is not None:
+                    self.stats["exact_hits"] += 1
+                    return payload
+            if not self.entries:
+                self.stats["misses"] += 1
+                return None
+
+        query_embedding = embed(normalized)
+        with self.lock:
+            scores = self.embeddings @ query_embedding
+            best_slot = int(np.argmax(scores))
+            best_key = self.slot_keys[best_slot]
+            if (best_key is not None and scores[best_slot] >= self.similarity_threshold
+                    and query_math_terms(self.entries[best_key].query) == query_math_terms(normalized)):
+                payload = self._hit(best_key, question)
+                if payload is not None:
+                    print(f"Answer cache semantic hit ({scores[best_slot]:.3f}): '{question}' ~ '{self.entries[best_key].query}'")
+                    self.stats["semantic_hits"] += 1
+                    return payload
+            self.stats["misses"] += 1
+            return None
+
+    def put(self, question: str, payload: dict, corpus_version: int, embed: Callable[[str], np.ndarray]) -> None:
+        if self.capacity <= 0:
+            return
+        normalized = normalize_query(question)
+        if not normalized:
+            return
+        key = self._key(normalized)
+        query_embedding = embed(normalized)
+        with self.lock:
+            if self.corpus_version is not None and corpus_version < self.corpus_version:
+                # Answered from a corpus that has changed since
+                return
+            self._check_corpus_version(corpus_version)
+            if key in self.entries:
+                self._remove(key)
+            if not self.free_slots:
+                self._remove(next(iter(self.entries)))
+            slot = self.free_slots.pop()
+            self.embeddings[slot] = query_embedding
+            self.slot_keys[slot] = key
+            self.entries[key] = AnswerCacheEntry(normalized, copy.deepcopy(payload), slot, time.time())
+
+    def clear(self) -> None:
+        with self.lock:
+            for key in list(self.entries):
+                self._remove(key)
+
+    def get_stats(self) -> dict:
+        with self.lock:
+            lookups = self.stats["exact_hits"] + self.stats["semantic_hits"] + self.stats["misses"]
+            hits = self.stats["exact_hits"] + self.stats["semantic_hits"]
+            return {
+                **self.stats,
+                "entries": len(self.entries),
+                "capacity": self.capacity,
+                "hit_rate": round(hits / lookups, 3) if lookups else 0
+            }
+
+
+# Singleton instance
+_answer_cache = None
+_answer_cache_lock = threading.Lock()
+
+def get_answer_cache() -> AnswerCache:
+    """Get the shared answer cache."""
+    global _answer_cache
+    if _answer_cache is None:
+        with _answer_cache_lock:
+            if _answer_cache is None:
+                _answer_cache = AnswerCache()
+    return _answer_cache
@@ -0,0 +1,182 @@
+import os
+import hashlib
+import subprocess
+import concurrent.futures
+from typing import Dict, Iterator, Tuple
+import pytesseract
+from pdf2image import convert_from_path, pdfinfo_from_path
+from backend.ocr_cache import get_ocr_cache
+
+# Configure Tesseract and Poppler paths
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+tesseract_path = os.path.join(BASE_DIR, 'Extensions', 'Tesseract-OCR', 'tesseract.exe')
+poppler_path = os.path.join(BASE_DIR, 'Extensions', 'poppler-24.08.0', 'Library', 'bin')
+
+pytesseract.pytesseract.tesseract_cmd = tesseract_path
+POPPLER_PATH = poppler_path
+
+# OCR settings, also part of the OCR cache key
+OCR_LANG = "eng"
+OCR_DPI = 200
+OCR_CONFIG = ""
+
+# Pages whose embedded text layer has fewer alphanumeric characters than this are OCR'd
+MIN_TEXT_LAYER_CHARS = 20
+
+# Streaming limits: pages rasterized per pdf2image call and OCR pages held in memory at once
+PDF_PAGE_WINDOW = 4
+OCR_WORKERS = int(os.environ.get("OCR_WORKERS", str(min(4, os.cpu_count() or 1))))
+MAX_INFLIGHT_PAGES = max(OCR_WORKERS * 2, PDF_PAGE_WINDOW)
+
+# File types picked up from the RAG docs folder
+SUPPORTED_EXTENSIONS = ['.txt', '.md', '.csv', '.json', '.html', '.xml', '.py', '.js', '.ts', '.css', '.pdf']
+
+
+class ExtractionError(Exception):
+    """A file's text could not be extracted; it should be retried on the next scan."""
+
+
+# This module is imported by extraction worker processes, so it must stay free
+# of heavy imports such as torch, transformers or faiss.
+
+
+def _ocr_cache_config() -> str:
+    return f"lang={OCR_LANG};dpi={OCR_DPI};config={OCR_CONFIG}"
+
+
+def _poppler_command(name: str) -> str:
+    """Resolve a Poppler tool from the bundled binaries, falling back to PATH."""
+    executable = os.path.join(POPPLER_PATH, name + (".exe" if os.name == "nt" else ""))
+    return executable if os.path.exists(executable) else name
+
+
+def extract_text_layer(pdf_path: str, page_count: int, timeout: int = 60) -> Dict[int, str]:
+    """
+    Read the embedded text layer of a PDF with pdftotext.
+
+    Returns {page_number: text} for pages with usable text only; scanned pages
+    are left out so the caller can OCR them.
+    """
+    try:
+        result = subprocess.run(
+            [_poppler_command("pdftotext"), "-layout", "-enc", "UTF-8", pdf_path, "-"],
+            capture_output=True,
+            timeout=timeout,
+            check=True
+        )
+    except Exception as e:
+        print(f"Could not read text layer of {pdf_path}, falling back to OCR: {e}")
+        return {}
+
+    # pdftotext ends every page with a form feed
+    pages = result.stdout.decode("utf-8", errors="replace").split("\f")
+    text_layer = {}
+    for page, text in enumerate(pages[:page_count], start=1):
+        if sum(1 for char in text if char.isalnum()) >= MIN_TEXT_LAYER_CHARS:
+            text_layer[page] = text
+    return text_layer
+
+
+def iter_pdf_pages(pdf_path: str, timeout: int = 30) -> Iterator[Tuple[int, str]]:
+    """
+    Yield (page_number, text) for every page of a PDF, in page order.
+
+    Pages are rasterized in windows of PDF_PAGE_WINDOW and OCR'd in a worker
+    pool with at most MAX_INFLIGHT_PAGES page images alive at a time, so
+    memory stays bounded regardless of the PDF length. Pages found in the OCR
+    cache or with a usable embedded text layer are never rasterized.
+    """
+    ocr_cache = get_ocr_cache()
+    cache_config = _ocr_cache_config()
+    pdf_hash = file_sha256(pdf_path)
+    page_count = pdfinfo_from_path(pdf_path, poppler_path=POPPLER_PATH)["Pages"]
+
+    ready_pages = ocr_cache.get_pages(pdf_hash, cache_config)
+    hits = sum(1 for page in range(1, page_count + 1) if page in ready_pages)
+    text_layer_pages = 0
+    if hits < page_count:
+        # Born-digital pages don't need OCR at all
+        text_layer = {page: text for page, text in extract_text_layer(pdf_path, page_count).items() if page not in ready_pages}
+        text_layer_pages = len(text_layer)
+        ready_pages.update(text_layer)
+    misses = page_count - hits - text_layer_pages
+    pending = {}
+    next_page = 1
+
+    def take_next_page() -> str:
+        if next_page in ready_pages:
+            return ready_pages.pop(next_page)
+        future = pending.pop(next_page)
+        try:
+            text = future.result(timeout=timeout)
+            ocr_cache.put(pdf_hash, next_page, cache_config, text)
+            return text
+        except concurrent.futures.TimeoutError:
+            raise ExtractionError(f"Timeout processing PDF page {next_page}: {pdf_path}")
+        except Exception as e:
+            # Pages OCR'd so far are cached, so a retry only redoes the rest
+            raise ExtractionError(f"Error processing PDF page {next_page}: {pdf_path}, {e}") from e
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=OCR_WORKERS) as executor:
+        for window_start in range(1, page_count + 1, PDF_PAGE_WINDOW):
+            window_end = min(window_start + PDF_PAGE_WINDOW - 1, page_count)
+            window_missing = [page for page in range(window_start, window_end + 1) if page not in ready_pages]
+
+            if window_missing:
+                images = convert_from_path(
+                    pdf_path,
+                    dpi=OCR_DPI,
+                    first_page=window_missing[0],
+                    last_page=window_missing[-1],
+                    poppler_path=POPPLER_PATH
+                )
+                for page, image in zip(range(window_missing[0], window_missing[-1] + 1), images):
+                    if page not in ready_pages:
+                        pending[page] = executor.submit(pytesseract.image_to_string, image, lang=OCR_LANG, config=OCR_CONFIG)
+                # Only the pending futures keep page images alive from here on
+                del images
+
+            # Hand out finished pages in order until the in-flight bound is respected again
+            while next_page <= page_count and (next_page in ready_pages or len(pending) >= MAX_INFLIGHT_PAGES):
+                yield next_page, take_next_page()
+                next_page += 1
+
+        while next_page <= page_count:
+            yield next_page, take_next_page()
+            next_page += 1
+
+    ocr_cache.record(hits=hits, misses=misses)
+    print(f"Extracted {os.path.basename(pdf_path)}: {text_layer_pages} pages from text layer, OCR cache {hits} hits, {misses} misses")
+
+
+def extract_pdf_text(pdf_path: str, timeout: int = 30) -> str:
+    """Text of every page of a PDF. Raises ExtractionError if any page fails or no text is found."""
+    text = "".join(text for _, text in iter_pdf_pages(pdf_path, timeout=timeout)).strip()
+    if not text:
+        raise ExtractionError(f"No text could be extracted from {pdf_path}")
+    return text
+
+
+def pdf_to_text(pdf_path: str, timeout: int = 30) -> str:
+    try:
+        return extract_pdf_text(pdf_path, timeout=timeout)
+    except Exception as e:
+        print(f"Error extracting PDF text: {pdf_path}, {e}")
+        return ""
+
+
+def extract_text(file_path: str) -> str:
+    """Extract the text content of a supported file. Raises if extraction fails."""
+    if file_path.lower().endswith('.pdf'):
+        return extract_pdf_text(file_path)
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def file_sha256(file_path: str, block_size: int = 1 << 20) -> str:
+    """Hash a file's bytes without loading it into memory at once."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
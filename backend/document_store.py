@@ -0,0 +1,138 @@
+import os
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List
+
+DOCUMENT_DB_PATH = os.path.join("document_store", "documents.sqlite")
+
+# Document fields stored as columns; content is kept apart and only read on demand
+DOCUMENT_COLUMNS = ["id", "title", "original_file", "last_modified", "in_folder", "metadata"]
+CHUNK_COLUMNS = ["id", "doc_id", "chunk_index", "start", "end", "title"]
+
+
+class DocumentStore:
+    """
+    SQLite store of RAG documents and their chunk spans.
+
+    One row per document and per chunk, so adding, updating or removing a
+    document only touches its own rows. Document metadata is cheap to load
+    in full; the text is read lazily, and a chunk's text is sliced out of its
+    document inside SQLite so retrieval never loads whole documents.
+    """
+
+    def __init__(self, db_path: str = DOCUMENT_DB_PATH):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self.lock = threading.RLock()
+        self._transaction_depth = 0
+        self.conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        with self.transaction():
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS documents ("
+                "id TEXT PRIMARY KEY, title TEXT NOT NULL, original_file TEXT NOT NULL, "
+                "last_modified REAL NOT NULL, in_folder INTEGER NOT NULL, metadata TEXT NOT NULL, "
+                "content TEXT NOT NULL)"
+            )
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS chunks ("
+                "id TEXT PRIMARY KEY, doc_id TEXT NOT NULL, chunk_index INTEGER NOT NULL, "
+                "start INTEGER NOT NULL, end INTEGER NOT NULL, title TEXT NOT NULL)"
+            )
+            self.conn.execute("CREATE INDEX IF NOT EXISTS chunks_doc_id ON chunks (doc_id)")
+
+    @contextmanager
+    def transaction(self):
+        """Group writes into one transaction, committed when the outermost block exits."""
+        with self.lock:
+            self._transaction_depth += 1
+            try:
+                yield
+            except BaseException:
+                self._transaction_depth -= 1
+                if self._transaction_depth == 0:
+                    self.conn.rollback()
+                raise
+            self._transaction_depth -= 1
+            if self._transaction_depth == 0:
+                self.conn.commit()
+
+    @staticmethod
+    def _document_row(document: Dict[str, Any]) -> tuple:
+        return (
+            document["id"], document["title"], document["original_file"], document["last_modified"],
+            int(document["in_folder"]), json.dumps(document["metadata"])
+        )
+
+    def is_empty(self) -> bool:
+        with self.lock:
+            return self.conn.execute("SELECT 1 FROM documents LIMIT 1").fetchone() is None
+
+    def load_documents(self) -> List[Dict[str, Any]]:
+        """All documents as dicts, without their content."""
+        with self.lock:
+            rows = self.conn.execute(f"SELECT {', '.join(DOCUMENT_COLUMNS)} FROM documents").fetchall()
+        documents = []
+        for row in rows:
+            document = dict(zip(DOCUMENT_COLUMNS, row))
+            document["in_folder"] = bool(document["in_folder"])
+            document["metadata"] = json.loads(document["metadata"])
+            documents.append(document)
+        return documents
+
+    def load_chunks(self) -> List[Dict[str, Any]]:
+        """All chunk spans as dicts, without their text."""
+        with self.lock:
+            rows = self.conn.execute(f"SELECT {', '.join(CHUNK_COLUMNS)} FROM chunks").fetchall()
+        return [dict(zip(CHUNK_COLUMNS, row)) for row in rows]
+
+    def get_content(self, doc_id: str) -> str:
+        with self.lock:
+            row = self.conn.execute("SELECT content FROM documents WHERE id = ?", (doc_id,)).fetchone()
+        return row[0] if row else ""
+
+    def get_chunk_texts(self, chunk_ids: List[str]) -> Dict[str, str]:
+        """Text of the given chunks, sliced from their documents by SQLite."""
+        if not chunk_ids:
+            return {}
+        placeholders = ",".join("?" for _ in chunk_ids)
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT chunks.id, substr(documents.content, chunks.start + 1, chunks.end - chunks.start) "
+                f"FROM chunks JOIN documents ON documents.id = chunks.doc_id WHERE chunks.id IN ({placeholders})",
+                chunk_ids
+            ).fetchall()
+        return dict(rows)
+
+    def put_document(self, document: Dict[str, Any], chunks: Iterable[Dict[str, Any]]) -> None:
+        """Insert or replace a document, its content and all of its chunks."""
+        with self.transaction():
+            self.conn.execute(
+                f"INSERT OR REPLACE INTO documents ({', '.join(DOCUMENT_COLUMNS)}, content) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                self._document_row(document) + (document["content"],)
+            )
+            self.conn.execute("DELETE FROM chunks WHERE doc_id = ?", (document["id"],))
+            self.conn.executemany(
+                f"INSERT INTO chunks ({', '.join(CHUNK_COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?)",
+                [tuple(chunk[column] for column in CHUNK_COLUMNS) for chunk in chunks]
+            )
+
+    def update_documents(self, documents: Iterable[Dict[str, Any]]) -> None:
+        """Update document metadata (title, flags, metadata dict), leaving content and chunks alone."""
+        with self.transaction():
+            self.conn.executemany(
+                "UPDATE documents SET title = ?, original_file = ?, last_modified = ?, in_folder = ?, metadata = ? WHERE id = ?",
+                [row[1:] + row[:1] for row in map(self._document_row, documents)]
+            )
+
+    def delete_document(self, doc_id: str) -> None:
+        with self.transaction():
+            self.conn.execute("DELETE FROM chunks WHERE doc_id = ?", (doc_id,))
+            self.conn.execute("DELETE FROM documents WHERE id = ?", (doc_id,))
+
+    def delete_all(self) -> None:
+        with self.transaction():
+            self.conn.execute("DELETE FROM chunks")
+            self.conn.execute("DELETE FROM documents")
@@ -0,0 +1,20 @@
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+# Dedicated, bounded pools for blocking work so CPU-bound model calls never run
+# on the event loop and one slow stage can't starve the others.
+# STT threads only decode uploads with ffmpeg; Whisper itself runs batched on the
+# transcription service's own thread. TTS
+# threads mostly wait on the TTS worker processes, which bound the real work.
+STT_EXECUTOR = ThreadPoolExecutor(max_workers=int(os.environ.get("STT_WORKERS", "4")), thread_name_prefix="stt")
+TTS_EXECUTOR = ThreadPoolExecutor(max_workers=int(os.environ.get("TTS_WORKERS", "4")), thread_name_prefix="tts")
+RAG_EXECUTOR = ThreadPoolExecutor(max_workers=int(os.environ.get("RAG_WORKERS", "2")), thread_name_prefix="rag")
+SCAN_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="scan")
+
+
+async def run_blocking(executor: ThreadPoolExecutor, func, *args, **kwargs):
+    """Run a blocking call on the given executor and await its result."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, functools.partial(func, *args, **kwargs))
@@ -0,0 +1,78 @@
+import os
+import sqlite3
+import threading
+from typing import Dict, List
+
+OCR_CACHE_PATH = os.path.join("document_store", "ocr_cache.sqlite")
+
+class OCRCache:
+    """
+    On-disk store of Tesseract output per PDF page.
+
+    Entries are keyed by the SHA-256 of the PDF, the page number and the OCR
+    configuration, so re-scans, restarts and re-indexing reuse earlier OCR
+    work. Hit and miss counters are persisted alongside the entries so that
+    counts from extraction worker processes add up.
+    """
+
+    def __init__(self, cache_path: str = OCR_CACHE_PATH):
+        self.cache_path = cache_path
+        # SQLite connections must not cross a fork, see get_ocr_cache
+        self.pid = os.getpid()
+        os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(cache_path, timeout=30, check_same_thread=False)
+        with self.lock, self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS pages ("
+                "pdf_hash TEXT NOT NULL, page INTEGER NOT NULL, config TEXT NOT NULL, text TEXT NOT NULL, "
+                "PRIMARY KEY (pdf_hash, page, config))"
+            )
+            self.conn.execute("CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            self.conn.execute("INSERT OR IGNORE INTO stats VALUES ('hits', 0), ('misses', 0)")
+
+    def get_pages(self, pdf_hash: str, config: str) -> Dict[int, str]:
+        """Return all cached page texts of a PDF as {page_number: text}."""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT page, text FROM pages WHERE pdf_hash = ? AND config = ?", (pdf_hash, config)
+            ).fetchall()
+        return {page: text for page, text in rows}
+
+    def put(self, pdf_hash: str, page: int, config: str, text: str) -> None:
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?)", (pdf_hash, page, config, text))
+
+    def record(self, hits: int = 0, misses: int = 0) -> None:
+        """Add to the persisted hit/miss counters."""
+        with self.lock, self.conn:
+            self.conn.execute("UPDATE stats SET value = value + ? WHERE name = 'hits'", (hits,))
+            self.conn.execute("UPDATE stats SET value = value + ? WHERE name = 'misses'", (misses,))
+
+    def get_stats(self) -> Dict[str, int]:
+        with self.lock:
+            stats = dict(self.conn.execute("SELECT name, value FROM stats").fetchall())
+            stats["entries"] = self.conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+        return stats
+
+    def purge(self, keep_hashes: List[str]) -> int:
+        """Drop entries of PDFs that are no longer in use. Returns the number of pages removed."""
+        with self.lock, self.conn:
+            placeholders = ",".join("?" for _ in keep_hashes)
+            query = "DELETE FROM pages"
+            if keep_hashes:
+                query += f" WHERE pdf_hash NOT IN ({placeholders})"
+            return self.conn.execute(query, keep_hashes).rowcount
+
+# Per-process instance
+_ocr_cache = None
+
+def get_ocr_cache() -> OCRCache:
+    """Get the OCR cache instance of the current process."""
+    global _ocr_cache
+    if _ocr_cache is None or _ocr_cache.pid != os.getpid():
+        # Forked extraction workers inherit the parent's instance; leave its
+        # connection alone and open their own
+        _ocr_cache = OCRCache()
+    return _ocr_cache
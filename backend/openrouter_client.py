@@ -0,0 +1,146 @@
+import asyncio
+import json
+import os
+import random
+from typing import Any, AsyncIterator, Dict, Optional
+import httpx
+
+# Endpoint and connection settings, overridable to point at a local stub server
+OPENROUTER_URL = os.environ.get("OPENROUTER_URL", "https://openrouter.ai/api/v1/chat/completions")
+OPENROUTER_CONNECT_TIMEOUT = float(os.environ.get("OPENROUTER_CONNECT_TIMEOUT", "5"))  # Seconds
+OPENROUTER_READ_TIMEOUT = float(os.environ.get("OPENROUTER_READ_TIMEOUT", "60"))  # Seconds
+OPENROUTER_MAX_CONNECTIONS = int(os.environ.get("OPENROUTER_MAX_CONNECTIONS", "20"))
+OPENROUTER_MAX_CONCURRENCY = int(os.environ.get("OPENROUTER_MAX_CONCURRENCY", "16"))  # Requests in flight
+OPENROUTER_MAX_RETRIES = int(os.environ.get("OPENROUTER_MAX_RETRIES", "3"))
+OPENROUTER_BACKOFF_BASE = 0.5  # Seconds, doubled per attempt
+OPENROUTER_BACKOFF_MAX = 8.0  # Seconds
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class OpenRouterError(Exception):
+    """Raised when OpenRouter answers a streaming request with an error."""
+
+
+class OpenRouterClient:
+    """
+    Shared async client for the OpenRouter chat completions API.
+
+    Keeps a pool of keep-alive connections so tutoring turns don't pay for a
+    TLS handshake each, bounds the number of requests in flight, and retries
+    429/5xx responses and transport errors with jittered exponential backoff.
+    """
+
+    def __init__(self, url: str = OPENROUTER_URL, max_concurrency: int = OPENROUTER_MAX_CONCURRENCY,
+                 max_retries: int = OPENROUTER_MAX_RETRIES):
+        self.url = url
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        # Created on first use so they bind to the server's event loop
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(OPENROUTER_READ_TIMEOUT, connect=OPENROUTER_CONNECT_TIMEOUT),
+                limits=httpx.Limits(
+                    max_connections=OPENROUTER_MAX_CONNECTIONS,
+                    max_keepalive_connections=OPENROUTER_MAX_CONNECTIONS
+                )
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._client
+
+    @staticmethod
+    def _headers(api_key: str) -> Dict[str, str]:
+        return {
+            "Authorization": f"Bearer {api_key}",
+            "HTTP-Referer": "http://localhost:8000",  # Placeholder
+            "X-Title": "AI Tutor App",  # Placeholder name
+            "Content-Type": "application/json",
+        }
+
+    @staticmethod
+    def _backoff_delay(attempt: int, response: Optional[httpx.Response] = None) -> float:
+        """Full-jitter exponential backoff, honouring a numeric Retry-After header."""
+        if response is not None:
+            retry_after = response.headers.get("Retry-After", "")
+            if retry_after.isdigit():
+                return min(float(retry_after), OPENROUTER_BACKOFF_MAX)
+        return random.uniform(0, min(OPENROUTER_BACKOFF_MAX, OPENROUTER_BACKOFF_BASE * (2 ** attempt)))
+
+    async def chat_completion(self, payload: Dict[str, Any], api_key: str) -> httpx.Response:
+        """POST a chat completion request, retrying transient failures. Returns the final response."""
+        client = self._get_client()
+        async with self._semaphore:
+            for attempt in range(self.max_retries + 1):
+                response = None
+                try:
+                    response = await client.post(self.url, headers=self._headers(api_key), json=payload)
+                    if response.status_code not in RETRY_STATUS_CODES or attempt == self.max_retries:
+                        return response
+                    print(f"OpenRouter returned {response.status_code}, retrying (attempt {attempt + 1}/{self.max_retries})")
+                except httpx.TransportError as e:
+                    if attempt == self.max_retries:
+                        raise
+                    print(f"OpenRouter request failed: {e}, retrying (attempt {attempt + 1}/{self.max_retries})")
+                await asyncio.sleep(self._backoff_delay(attempt, response))
+
+    async def stream_chat_completion(self, payload: Dict[str, Any], api_key: str) -> AsyncIterator[str]:
+        """
+        POST a streaming chat completion and yield content deltas as they arrive.
+
+        Transient failures are retried like chat_completion, but only until the
+        first piece of content has been received.
+        """
+        client = self._get_client()
+        async with self._semaphore:
+            for attempt in range(self.max_retries + 1):
+                received = False
+                retry_response = None
+                try:
+                    async with client.stream("POST", self.url, headers=self._headers(api_key), json={**payload, "stream": True}) as response:
+                        if response.status_code in RETRY_STATUS_CODES and attempt < self.max_retries:
+                            print(f"OpenRouter returned {response.status_code}, retrying (attempt {attempt + 1}/{self.max_retries})")
+                            retry_response = response
+                        elif response.status_code != 200:
+                            body = await response.aread()
+                            raise OpenRouterError(f"OpenRouter returned {response.status_code}: {body[:500].decode('utf-8', errors='replace')}")
+                        else:
+                            async for line in response.aiter_lines():
+                                # Server-sent events; lines starting with ':' are keep-alive comments
+                                if not line.startswith("data:"):
+                                    continue
+                                data = line[len("data:"):].strip()
+                                if data == "[DONE]":
+                                    return
+                                chunk = json.loads(data)
+                                if "error" in chunk:
+                                    raise OpenRouterError(chunk["error"].get("message", "Unknown API error"))
+                                choices = chunk.get("choices") or []
+                                content = choices[0].get("delta", {}).get("content") if choices else None
+                                if content:
+                                    received = True
+                                    yield content
+                            return
+                except httpx.TransportError as e:
+                    if received or attempt == self.max_retries:
+                        raise
+                    print(f"OpenRouter stream failed: {e}, retrying (attempt {attempt + 1}/{self.max_retries})")
+                await asyncio.sleep(self._backoff_delay(attempt, retry_response))
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+# Singleton instance
+_openrouter_client = None
+
+def get_openrouter_client() -> OpenRouterClient:
+    """Get the shared OpenRouter client."""
+    global _openrouter_client
+    if _openrouter_client is None:
+        _openrouter_client = OpenRouterClient()
+    return _openrouter_client
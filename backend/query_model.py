@@ -5,9 +5,13 @@ import os
 from huggingface_hub import hf_hub_download, login
 from llama_cpp import Llama
 from backend.rag_system import get_rag_system, format_retrieved_context
-import requests
+from backend.executors import RAG_EXECUTOR, run_blocking
+from backend.openrouter_client import get_openrouter_client
+from backend.answer_cache import get_answer_cache, ANSWER_CACHE_WITH_HISTORY
 import json
+import re
 import time
+from typing import Optional, Tuple
 
 # Store the LLM instance
 global llm
@@ -139,20 +143,7 @@ Ensure responses are children friendly.
 """
 
 
-def get_answer_from_text(text):
-    global llm
-    # Initialize llm if needed
-    if 'llm' not in globals() or llm is None:
-        main()
-    
-    try:
-        print(f"Input text type: {type(text)}")
-        
-        # Get enhanced prompt with RAG context if available
-        enhanced_prompt, retrieved_docs = get_rag_enhanced_prompt(str(text), prompt_template)
-        
-        # Define the system message with the NEW JSON schema instructions
-        system_message = """
+TUTOR_SYSTEM_MESSAGE = """
         You are a helpful tutor for primary school students. Keep responses short and engaging.
 
         When your response requires a visual representation (like explaining math with objects),
@@ -198,38 +189,159 @@ def get_answer_from_text(text):
         - If no drawing is needed, return JSON with an empty `scene` array: {"explanation": "Your text here", "scene": [], "final_answer": {...}}.
         - Do NOT include any text outside the JSON object. Your entire response must be the JSON itself.
         """
+
+TUTOR_MODEL = "meta-llama/llama-4-maverick:free"
+
+
+def get_openrouter_api_key() -> str:
+    return os.environ.get("OPENROUTER_API_KEY", "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")
+
+
+async def build_tutor_messages(text, history=None):
+    """
+    Build the OpenRouter messages for a tutoring question, with RAG context if
+    available and the session's recent turns (see SessionStore.get_history).
+    """
+    # Get enhanced prompt with RAG context if available (embedding the query is CPU-bound)
+    enhanced_prompt, retrieved_docs = await run_blocking(RAG_EXECUTOR, get_rag_enhanced_prompt, str(text), prompt_template)
+    
+    # Prepare the user message with context if available
+    user_content = text
+    if enhanced_prompt.get("context"):
+        user_content = f"{enhanced_prompt['context']}\n\nBased on the above information (if relevant), please answer the following question:\n{enhanced_prompt['query']}"
+    
+    messages = [
+        {
+            "role": "system",
+            "content": TUTOR_SYSTEM_MESSAGE
+        },
+        *(history or []),
+        {
+            "role": "user",
+            "content": user_content
+        }
+    ]
+    return messages, retrieved_docs
+
+
+def lookup_cached_answer(text):
+    """Returns (cached_result_or_None, corpus_version) for the question."""
+    corpus_version = get_rag_system().corpus_version
+    return get_answer_cache().get(str(text), corpus_version, get_rag_system().embed_query), corpus_version
+
+
+def cache_answer(text, result, corpus_version):
+    # Only answers that parsed as tutor JSON carry source_documents; raw-text
+    # fallbacks and errors aren't worth repeating to other students
+    if isinstance(result, dict) and "source_documents" in result:
+        get_answer_cache().put(str(text), result, corpus_version, get_rag_system().embed_query)
+
+
+def parse_tutor_response(text, llm_response_content, retrieved_docs):
+    """Turn the raw LLM completion into the structured tutor response."""
+    # Attempt to parse the LLM response as JSON
+    try:
+        parsed_json = json.loads(llm_response_content)
+        
+        # Validate the structure
+        if isinstance(parsed_json, dict) and \
+        "explanation" in parsed_json and isinstance(parsed_json["explanation"], str) and \
+        "scene" in parsed_json and isinstance(parsed_json["scene"], list) and \
+        "final_answer" in parsed_json and isinstance(parsed_json["final_answer"], dict):
+            
+            explanation_text = parsed_json["explanation"]
+            scene_data = parsed_json["scene"]
+            final_answer = parsed_json["final_answer"]
+            
+            # Construct the result in the updated format
+            result = {
+                "question": text, # Original user query
+                "answer": {
+                    "explanation": explanation_text, # Text for TTS
+                    "scene": scene_data, # Scene description for frontend
+                    "final_answer": final_answer # Answer validation information
+                },
+                "source_documents": retrieved_docs # Include source documents in the response
+            }
+            print(f"Successfully parsed LLM response. Explanation: '{explanation_text[:50]}...', Scene items: {len(scene_data)}")
+            return result
+        else:
+            print("Error: LLM response is valid JSON but does not match the expected schema.")
+            print(f"Received JSON: {llm_response_content}")
+            
+            # If missing final_answer but otherwise valid, try to add a default one
+            if "explanation" in parsed_json and "scene" in parsed_json and "final_answer" not in parsed_json:
+                print("Adding default final_answer field")
+                parsed_json["final_answer"] = {
+                    "correct_value": "unknown",
+                    "explanation": "No answer validation information provided",
+                    "feedback_correct": "Good job!",
+                    "feedback_incorrect": "Try again!"
+                }
+                
+                # Return with the added default final_answer
+                result = {
+                    "question": text,
+                    "answer": {
+                        "explanation": parsed_json["explanation"],
+                        "scene": parsed_json["scene"],
+                        "final_answer": parsed_json["final_answer"]
+                    },
+                    "source_documents": retrieved_docs
+                }
+                return result
         
-        # Prepare the user message with context if available
-        user_content = text
-        if enhanced_prompt.get("context"):
-            user_content = f"{enhanced_prompt['context']}\n\nBased on the above information (if relevant), please answer the following question:\n{enhanced_prompt['query']}"
+        # If we got here, the JSON didn't match our expected schema
+        return f"I'm sorry, I received an unexpected response format from the AI model."
         
-        # Make the API call to OpenRouter
-        api_key = os.environ.get("OPENROUTER_API_KEY", "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")
+    except json.JSONDecodeError:
+        print("Error: LLM response was not valid JSON.")
+        print(f"Received content: {llm_response_content}")
+        # Fallback: return the raw content as explanation, assuming no scene
+        result = {
+            "question": text,
+            "answer": {
+                "explanation": llm_response_content, # Use raw response as explanation
+                "scene": [], # Empty scene
+                "final_answer": {
+                    "correct_value": "",
+                    "explanation": "",
+                    "feedback_correct": "Good job!",
+                    "feedback_incorrect": "Try again!"
+                }
+            }
+        }
+        return result   
+
+
+async def get_answer_from_text(text, history=None):
+    global llm
+    # Initialize llm if needed
+    if 'llm' not in globals() or llm is None:
+        main()
+    
+    try:
+        print(f"Input text type: {type(text)}")
         
-        print(f"Making OpenRouter API call for: {user_content[:100]}...")
+        # Follow-ups depend on the conversation, so only standalone questions use the cache
+        use_cache = ANSWER_CACHE_WITH_HISTORY or not history
+        if use_cache:
+            cached_result, corpus_version = await run_blocking(RAG_EXECUTOR, lookup_cached_answer, text)
+            if cached_result is not None:
+                print(f"Answer cache hit for: {text}")
+                return cached_result
+        
+        messages, retrieved_docs = await build_tutor_messages(text, history)
+        
+        # Make the API call to OpenRouter
+        print(f"Making OpenRouter API call for: {messages[-1]['content'][:100]}...")
         
-        response = requests.post(
-            url="https://openrouter.ai/api/v1/chat/completions",
-            headers={
-                "Authorization": f"Bearer {api_key}",
-                "HTTP-Referer": "http://localhost:8000",  # Placeholder
-                "X-Title": "AI Tutor App",  # Placeholder name
-                "Content-Type": "application/json",
+        response = await get_openrouter_client().chat_completion(
+            {
+                "model": TUTOR_MODEL,
+                "messages": messages
             },
-            data=json.dumps({
-                "model": "meta-llama/llama-4-maverick:free",  # Using the specified model
-                "messages": [
-                    {
-                        "role": "system",
-                        "content": system_message
-                    },
-                    {
-                        "role": "user",
-                        "content": user_content
-                    }
-                ]
-            })
+            get_openrouter_api_key()
         )
         
         response_data = response.json()
@@ -237,99 +349,10 @@ def get_answer_from_text(text):
         
         if response.status_code == 200 and "choices" in response_data and len(response_data["choices"]) > 0:
             llm_response_content = response_data["choices"][0]["message"]["content"]
-
-            # Check if the response contains a question
-            if '?' in llm_response_content:
-                # Determine if the response is a question or contains a question
-                sentences = llm_response_content.split('. ')
-                explanation = '. '.join([s for s in sentences if '?' not in s])
-                question = '. '.join([s for s in sentences if '?' in s])
-                answer = "User's answer."  
-                
-                result = {
-                    "explanation": explanation,
-                    "question": question,
-                    "answer": answer
-                }
-            else:
-                explanation = llm_response_content
-                result = {
-                    "explanation": explanation
-                }
-
-            # Attempt to parse the LLM response as JSON
-            try:
-                parsed_json = json.loads(llm_response_content)
-                
-                # Validate the structure
-                if isinstance(parsed_json, dict) and \
-                "explanation" in parsed_json and isinstance(parsed_json["explanation"], str) and \
-                "scene" in parsed_json and isinstance(parsed_json["scene"], list) and \
-                "final_answer" in parsed_json and isinstance(parsed_json["final_answer"], dict):
-                    
-                    explanation_text = parsed_json["explanation"]
-                    scene_data = parsed_json["scene"]
-                    final_answer = parsed_json["final_answer"]
-                    
-                    # Construct the result in the updated format
-                    result = {
-                        "question": text, # Original user query
-                        "answer": {
-                            "explanation": explanation_text, # Text for TTS
-                            "scene": scene_data, # Scene description for frontend
-                            "final_answer": final_answer # Answer validation information
-                        },
-                        "source_documents": retrieved_docs # Include source documents in the response
-                    }
-                    print(f"Successfully parsed LLM response. Explanation: '{explanation_text[:50]}...', Scene items: {len(scene_data)}")
-                    return result
-                else:
-                    print("Error: LLM response is valid JSON but does not match the expected schema.")
-                    print(f"Received JSON: {llm_response_content}")
-                    
-                    # If missing final_answer but otherwise valid, try to add a default one
-                    if "explanation" in parsed_json and "scene" in parsed_json and "final_answer" not in parsed_json:
-                        print("Adding default final_answer field")
-                        parsed_json["final_answer"] = {
-                            "correct_value": "unknown",
-                            "explanation": "No answer validation information provided",
-                            "feedback_correct": "Good job!",
-                            "feedback_incorrect": "Try again!"
-                        }
-                        
-                        # Return with the added default final_answer
-                        result = {
-                            "question": text,
-                            "answer": {
-                                "explanation": parsed_json["explanation"],
-                                "scene": parsed_json["scene"],
-                                "final_answer": parsed_json["final_answer"]
-                            },
-                            "source_documents": retrieved_docs
-                        }
-                        return result
-                
-                # If we got here, the JSON didn't match our expected schema
-                return f"I'm sorry, I received an unexpected response format from the AI model."
-                
-            except json.JSONDecodeError:
-                print("Error: LLM response was not valid JSON.")
-                print(f"Received content: {llm_response_content}")
-                # Fallback: return the raw content as explanation, assuming no scene
-                result = {
-                    "question": text,
-                    "answer": {
-                        "explanation": llm_response_content, # Use raw response as explanation
-                        "scene": [], # Empty scene
-                        "final_answer": {
-                            "correct_value": "",
-                            "explanation": "",
-                            "feedback_correct": "Good job!",
-                            "feedback_incorrect": "Try again!"
-                        }
-                    }
-                }
-                return result   
+            result = parse_tutor_response(text, llm_response_content, retrieved_docs)
+            if use_cache:
+                await run_blocking(RAG_EXECUTOR, cache_answer, text, result, corpus_version)
+            return result
         else:
             error_message = response_data.get("error", {}).get("message", "Unknown API error")
             return f"Error: {error_message}"
@@ -339,12 +362,172 @@ def get_answer_from_text(text):
         print(f"Text: {text} ({type(text)})")
         return f"I'm sorry, an error occurred: {str(e)}"
 
+
+class ExplanationStreamParser:
+    """
+    Incrementally extract the top-level "explanation" string from a JSON
+    completion that arrives in pieces, so it can be spoken before the rest
+    of the response (scene, final answer) has been generated.
+    """
+    VALUE_PATTERN = re.compile(r'\s*:\s*"')  # Between the key and its string value
+    PENDING_VALUE_PATTERN = re.compile(r'\s*(:\s*)?')  # The same, not fully arrived yet
+    HEX4_PATTERN = re.compile(r'[0-9a-fA-F]{4}')
+    ESCAPES = {'n': '\n', 't': '\t', 'r': '\r', 'b': '\b', 'f': '\f', '"': '"', '\\': '\\', '/': '/'}
+
+    def __init__(self):
+        self.buffer = ""  # Full completion received so far
+        self.position = None  # Next unread index inside the explanation string
+        self.done = False
+
+    def _string_end(self, start: int) -> Optional[int]:
+        """Index of the quote closing the JSON string opened at `start`, None if it hasn't arrived."""
+        i = start + 1
+        while i < len(self.buffer):
+            if self.buffer[i] == '\\':
+                i += 2
+            elif self.buffer[i] == '"':
+                return i
+            else:
+                i += 1
+        return None
+
+    def _find_explanation(self) -> Optional[int]:
+        """
+        Start of the value of the "explanation" key of the outermost object,
+        skipping keys of the same name in nested objects and inside strings.
+        """
+        depth = 0
+        i = 0
+        while i < len(self.buffer):
+            char = self.buffer[i]
+            if char in '{[':
+                depth += 1
+            elif char in '}]':
+                depth -= 1
+            elif char == '"':
+                end = self._string_end(i)
+                if end is None:
+                    return None
+                if depth == 1 and self.buffer[i + 1:end] == "explanation":
+                    match = self.VALUE_PATTERN.match(self.buffer, end + 1)
+                    if match:
+                        return match.end()
+                    if self.PENDING_VALUE_PATTERN.fullmatch(self.buffer, end + 1):
+                        return None
+                i = end + 1
+                continue
+            i += 1
+        return None
+
+    def _unicode_escape(self, i: int) -> Tuple[Optional[str], int]:
+        """
+        Decode the \\uXXXX escape at `i`, joining surrogate pairs. Returns
+        (text, length), or (None, 0) if the escape hasn't fully arrived.
+        Malformed escapes are kept as they are rather than failing the stream.
+        """
+        if i + 6 > len(self.buffer):
+            return None, 0
+        if not self.HEX4_PATTERN.fullmatch(self.buffer, i + 2, i + 6):
+            return self.buffer[i:i + 2], 2
+        code = int(self.buffer[i + 2:i + 6], 16)
+        if 0xD800 <= code < 0xDC00:
+            if i + 12 > len(self.buffer):
+                return None, 0
+            if self.buffer[i + 6:i + 8] == '\\u' and self.HEX4_PATTERN.fullmatch(self.buffer, i + 8, i + 12):
+                low = int(self.buffer[i + 8:i + 12], 16)
+                if 0xDC00 <= low < 0xE000:
+                    return chr(0x10000 + ((code - 0xD800) << 10) + (low - 0xDC00)), 12
+            return '\ufffd', 6
+        if 0xDC00 <= code < 0xE000:
+            # Lone low surrogate, not encodable as UTF-8
+            return '\ufffd', 6
+        return chr(code), 6
+
+    def feed(self, delta: str) -> str:
+        """Add a piece of the completion and return any newly decoded explanation text."""
+        self.buffer += delta
+        if self.done:
+            return ""
+        if self.position is None:
+            self.position = self._find_explanation()
+            if self.position is None:
+                return ""
+
+        decoded = []
+        i = self.position
+        while i < len(self.buffer):
+            char = self.buffer[i]
+            if char == '"':
+                self.done = True
+                i += 1
+                break
+            if char == '\\':
+                # Wait for the rest of an escape sequence split across deltas
+                if i + 1 >= len(self.buffer):
+                    break
+                escaped = self.buffer[i + 1]
+                if escaped == 'u':
+                    text, length = self._unicode_escape(i)
+                    if text is None:
+                        break
+                    decoded.append(text)
+                    i += length
+                    continue
+                decoded.append(self.ESCAPES.get(escaped, escaped))
+                i += 2
+                continue
+            decoded.append(char)
+            i += 1
+        self.position = i
+        return "".join(decoded)
+
+
+async def stream_answer_from_text(text, history=None):
+    """
+    Stream a tutoring answer from OpenRouter.
+
+    Yields ("explanation", text_delta) as the explanation field is generated,
+    then a single ("result", structured_response) once the completion ends.
+    """
+    global llm
+    if 'llm' not in globals() or llm is None:
+        main()
+    
+    use_cache = ANSWER_CACHE_WITH_HISTORY or not history
+    if use_cache:
+        cached_result, corpus_version = await run_blocking(RAG_EXECUTOR, lookup_cached_answer, text)
+        if cached_result is not None:
+            print(f"Answer cache hit for: {text}")
+            yield "explanation", cached_result["answer"]["explanation"]
+            yield "result", cached_result
+            return
+    
+    messages, retrieved_docs = await build_tutor_messages(text, history)
+    print(f"Streaming OpenRouter API call for: {messages[-1]['content'][:100]}...")
+    
+    parser = ExplanationStreamParser()
+    async for delta in get_openrouter_client().stream_chat_completion(
+        {
+            "model": TUTOR_MODEL,
+            "messages": messages
+        },
+        get_openrouter_api_key()
+    ):
+        explanation_delta = parser.feed(delta)
+        if explanation_delta:
+            yield "explanation", explanation_delta
+    
+    result = parse_tutor_response(text, parser.buffer, retrieved_docs)
+    if use_cache:
+        await run_blocking(RAG_EXECUTOR, cache_answer, text, result, corpus_version)
+    yield "result", result
+
 import base64
 from backend.image_cache import ImageCache
 
 image_cache = ImageCache()
 
-def get_answer_from_image_and_prompt(image_data: bytes, prompt: str) -> str:
+async def get_answer_from_image_and_prompt(image_data: bytes, prompt: str) -> str:
     try:
         # Cache image
         filename = 'whiteboard.png'
@@ -358,23 +541,16 @@ def get_answer_from_image_and_prompt(image_data: bytes, prompt: str) -> str:
         encoded_image = base64.b64encode(latest_image).decode('utf-8')
 
         # Prepare the API call to OpenRouter
-        api_key = os.environ.get("OPENROUTER_API_KEY", "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")
+        api_key = get_openrouter_api_key()
         
         system_message = """
         You are a helpful assistant that can understand images and text prompts.
         Respond based on the content of the image and the user's prompt.
         """
 
-        response = requests.post(
-            url="https://openrouter.ai/api/v1/chat/completions",
-            headers={
-                "Authorization": f"Bearer {api_key}",
-                "HTTP-Referer": "http://localhost:8000",
-                "X-Title": "AI Tutor App",
-                "Content-Type": "application/json",
-            },
-            data=json.dumps({
-                "model": "meta-llama/llama-4-maverick:free",
+        response = await get_openrouter_client().chat_completion(
+            {
+                "model": TUTOR_MODEL,
                 "messages": [
                     {
                         "role": "system",
@@ -396,7 +572,8 @@ def get_answer_from_image_and_prompt(image_data: bytes, prompt: str) -> str:
                         ]
                     }
                 ]
-            })
+            },
+            api_key
         )
 
         response_data = response.json()
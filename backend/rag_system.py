@@ -2,24 +2,22 @@ import os
 import numpy as np
 import faiss
 from typing import List, Dict, Tuple, Optional, Any
+from collections import OrderedDict
 import json
 import time
-from dataclasses import dataclass, asdict, field
+from dataclasses import dataclass, asdict, field, replace
 from transformers import AutoTokenizer, AutoModel
 import torch
 import hashlib
+import threading
+import concurrent.futures
+import multiprocessing
+from contextlib import contextmanager
 from pathlib import Path
-import pytesseract
-from PIL import Image
-from pdf2image import convert_from_path
-
-# Configure Tesseract and Poppler paths
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-tesseract_path = os.path.join(BASE_DIR, 'Extensions', 'Tesseract-OCR', 'tesseract.exe')
-poppler_path = os.path.join(BASE_DIR, 'Extensions', 'poppler-24.08.0', 'Library', 'bin')
-
-pytesseract.pytesseract.tesseract_cmd = tesseract_path
-POPPLER_PATH = poppler_path
+from backend.document_loader import SUPPORTED_EXTENSIONS, POPPLER_PATH, extract_text, file_sha256, pdf_to_text
+from backend.ocr_cache import get_ocr_cache
+from backend.document_store import DocumentStore
+from backend.answer_cache import normalize_query
 
 # System constants
 EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
@@ -27,12 +25,20 @@ EMBEDDING_DIMENSION = 384  # Dimension of the MiniLM-L6-v2 model
 FAISS_INDEX_DIR = "vector_store"
 DOCUMENT_STORE_DIR = "document_store"
 RAG_DOCS_DIR = "backend/RAG_docs"  # Directory to scan for documents
+SCAN_WORKERS = int(os.environ.get("RAG_SCAN_WORKERS", str(min(4, os.cpu_count() or 1))))  # Processes extracting changed files
 SIMILARITY_THRESHOLD = 0.7  # Minimum similarity score to consider a document relevant
+CHUNK_SIZE = 200  # Tokens per chunk window (MiniLM-L6-v2 was trained on sequences up to 256)
+CHUNK_OVERLAP = 50  # Tokens shared between consecutive chunk windows
+INDEX_COMPACTION_THRESHOLD = 0.25  # Fraction of dead vectors in the FAISS index that triggers compaction
+EMBEDDING_BATCH_SIZE = 32  # Texts per forward pass in generate_embeddings
+EMBEDDING_NUM_THREADS = int(os.environ.get("EMBEDDING_NUM_THREADS", "0"))  # 0 keeps the torch default
+QUERY_CACHE_SIZE = int(os.environ.get("RAG_QUERY_CACHE_SIZE", "1024"))  # Query embeddings kept in memory
+INGEST_BATCH_DOCUMENTS = int(os.environ.get("RAG_INGEST_BATCH_DOCUMENTS", "64"))  # Documents embedded together during bulk ingestion
 
 @dataclass
 class Document:
     id: str
-    content: str
+    content: str  # Only held in memory while (re)indexing, otherwise read from the DocumentStore
     title: str
     original_file: str = ""
     last_modified: float = 0.0
@@ -42,12 +48,65 @@ class Document:
     def to_dict(self) -> Dict[str, Any]:
         return asdict(self)
 
+@dataclass
+class Chunk:
+    id: str
+    doc_id: str
+    chunk_index: int
+    start: int  # Character offset into the parent document content
+    end: int
+    title: str = ""
+    content: str = ""  # Filled in for retrieved chunks only
+
+    def to_dict(self) -> Dict[str, Any]:
+        # Content is not persisted, it is sliced from the parent document when retrieved
+        chunk_dict = asdict(self)
+        del chunk_dict["content"]
+        return chunk_dict
+
 class EmbeddingModel:
     def __init__(self):
-        print(f"Initializing embedding model: {EMBEDDING_MODEL}")
-        self.tokenizer = AutoTokenizer.from_pretrained(EMBEDDING_MODEL)
-        self.model = AutoModel.from_pretrained(EMBEDDING_MODEL)
-        self.model.to('cpu')
+        # Loaded on first use so creating the RAG system stays cheap
+        self._tokenizer = None
+        self._model = None
+        self._load_lock = threading.Lock()
+
+    def load(self) -> None:
+        """Load the tokenizer and model if that hasn't happened yet."""
+        if self._model is not None:
+            return
+        with self._load_lock:
+            if self._model is None:
+                print(f"Initializing embedding model: {EMBEDDING_MODEL}")
+                if EMBEDDING_NUM_THREADS > 0:
+                    torch.set_num_threads(EMBEDDING_NUM_THREADS)
+                self._tokenizer = AutoTokenizer.from_pretrained(EMBEDDING_MODEL)
+                model = AutoModel.from_pretrained(EMBEDDING_MODEL)
+                model.to('cpu')
+                model.eval()
+                self._model = model
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._model is not None
+
+    @property
+    def tokenizer(self):
+        self.load()
+        return self._tokenizer
+
+    @property
+    def model(self):
+        self.load()
+        return self._model
+    
+    @staticmethod
+    def _mean_pool(last_hidden_state: torch.Tensor, attention_mask: torch.Tensor) -> torch.Tensor:
+        """Mean Pooling - Take average of all token embeddings, ignoring padding."""
+        input_mask_expanded = attention_mask.unsqueeze(-1).expand(last_hidden_state.size()).float()
+        sum_embeddings = torch.sum(last_hidden_state * input_mask_expanded, 1)
+        sum_mask = torch.clamp(input_mask_expanded.sum(1), min=1e-9)
+        return sum_embeddings / sum_mask
         
     def generate_embedding(self, text: str) -> np.ndarray:
         """Generate text embedding."""
@@ -64,18 +123,118 @@ class EmbeddingModel:
         
         with torch.no_grad():
             outputs = self.model(**inputs)
-            
-            # Mean Pooling - Take average of all token embeddings
-            attention_mask = inputs['attention_mask']
-            embeddings = outputs.last_hidden_state
-            input_mask_expanded = attention_mask.unsqueeze(-1).expand(embeddings.size()).float()
-            sum_embeddings = torch.sum(embeddings * input_mask_expanded, 1)
-            sum_mask = torch.clamp(input_mask_expanded.sum(1), min=1e-9)
-            
-            # Normalize embeddings
-            embeddings = sum_embeddings / sum_mask
-            
+            embeddings = self._mean_pool(outputs.last_hidden_state, inputs['attention_mask'])
             return embeddings[0].cpu().numpy()
+    
+    def generate_embeddings(self, texts: List[str], batch_size: int = EMBEDDING_BATCH_SIZE) -> np.ndarray:
+        """
+        Generate embeddings for many texts in batched forward passes.
+
+        Texts are sorted by token length so each batch is padded only to its
+        own longest member. Rows of the result follow the order of `texts`.
+
+        Returns:
+            Contiguous float32 matrix of shape (len(texts), EMBEDDING_DIMENSION)
+        """
+        embeddings = np.empty((len(texts), EMBEDDING_DIMENSION), dtype=np.float32)
+        if not texts:
+            return embeddings
+        
+        encoded = self.tokenizer(list(texts), truncation=True, max_length=512)
+        order = sorted(range(len(texts)), key=lambda i: len(encoded['input_ids'][i]))
+        
+        with torch.no_grad():
+            for batch_start in range(0, len(order), batch_size):
+                batch_rows = order[batch_start:batch_start + batch_size]
+                inputs = self.tokenizer.pad(
+                    {key: [encoded[key][i] for i in batch_rows] for key in encoded.keys()},
+                    padding=True,
+                    return_tensors="pt"
+                )
+                outputs = self.model(**inputs)
+                pooled = self._mean_pool(outputs.last_hidden_state, inputs['attention_mask'])
+                embeddings[batch_rows] = pooled.cpu().numpy()
+        
+        return embeddings
+
+    def chunk_text(self, text: str, chunk_size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP) -> List[Tuple[int, int]]:
+        """Split text into overlapping token windows, returned as (start, end) character spans."""
+        if not text.strip():
+            return []
+        
+        encoding = self.tokenizer(
+            text,
+            add_special_tokens=False,
+            truncation=False,
+            return_offsets_mapping=True,
+            verbose=False
+        )
+        offsets = encoding["offset_mapping"]
+        if not offsets:
+            return []
+        
+        step = max(chunk_size - overlap, 1)
+        spans = []
+        for first in range(0, len(offsets), step):
+            window = offsets[first:first + chunk_size]
+            spans.append((window[0][0], window[-1][1]))
+            if first + chunk_size >= len(offsets):
+                break
+        return spans
+
+
+class QueryEmbeddingCache:
+    """
+    LRU cache of normalized query -> normalized embedding.
+
+    Vectors live in one preallocated float32 array; the OrderedDict only maps
+    each query to its row, so entries cost no per-vector Python objects.
+    """
+
+    def __init__(self, capacity: int = QUERY_CACHE_SIZE, dimension: int = EMBEDDING_DIMENSION):
+        self.capacity = capacity
+        self.vectors = np.zeros((capacity, dimension), dtype=np.float32)
+        self.slots: "OrderedDict[str, int]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, query: str) -> Optional[np.ndarray]:
+        with self.lock:
+            slot = self.slots.get(query)
+            if slot is None:
+                self.misses += 1
+                return None
+            self.slots.move_to_end(query)
+            self.hits += 1
+            return self.vectors[slot].copy()
+
+    def put(self, query: str, embedding: np.ndarray) -> None:
+        if self.capacity <= 0:
+            return
+        with self.lock:
+            slot = self.slots.pop(query, None)
+            if slot is None:
+                # Reuse the least recently used row once the pool is full
+                slot = len(self.slots) if len(self.slots) < self.capacity else self.slots.popitem(last=False)[1]
+            self.vectors[slot] = embedding
+            self.slots[query] = slot
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.slots),
+                "capacity": self.capacity,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0
+            }
+
+
+def create_faiss_index() -> faiss.Index:
+    """Create an empty inner-product index addressed by stable 64-bit vector ids."""
+    return faiss.IndexIDMap2(faiss.IndexFlatIP(EMBEDDING_DIMENSION))
 
 
 class RAGSystem:
@@ -86,52 +245,75 @@ class RAGSystem:
         os.makedirs(RAG_DOCS_DIR, exist_ok=True)
         
         self.embedding_model = EmbeddingModel()
+        self.query_cache = QueryEmbeddingCache()
+        # Serializes FAISS mutations against searches running on other threads
+        self.index_lock = threading.Lock()
         self.index_path = os.path.join(FAISS_INDEX_DIR, "index.faiss")
+        self.document_store = DocumentStore(os.path.join(DOCUMENT_STORE_DIR, "documents.sqlite"))
+        # JSON files of the previous document store, migrated once on startup
         self.document_path = os.path.join(DOCUMENT_STORE_DIR, "documents.json")
+        self.chunk_path = os.path.join(DOCUMENT_STORE_DIR, "chunks.json")
+        self.id_map_path = os.path.join(FAISS_INDEX_DIR, "id_map.json")
+        self.manifest_path = os.path.join(DOCUMENT_STORE_DIR, "scan_manifest.json")
+        self.embeddings_path = os.path.join(FAISS_INDEX_DIR, "embeddings.npy")
+        self.embedding_ids_path = os.path.join(FAISS_INDEX_DIR, "embedding_ids.npy")
+        self.embeddings_meta_path = os.path.join(FAISS_INDEX_DIR, "embeddings.json")
         self.documents = {}
-        self.doc_id_to_index = {}
+        self.chunks = {}
+        # FAISS vector id <-> chunk id, so search hits resolve in constant time
+        self.vector_id_to_chunk_id: Dict[int, str] = {}
+        self.chunk_id_to_vector_id: Dict[str, int] = {}
+        self.next_vector_id = 0
+        # Vector ids of removed chunks still physically present in the index
+        self.tombstones = set()
+        # Bumped whenever the indexed content changes, so caches of answers built
+        # from retrieved chunks know when they are stale
+        self.corpus_version = 0
+        # Normalized embedding of every vector in the index, row i belonging to
+        # vector id embedding_ids[i]. Memory-mapped from disk until modified;
+        # vectors added since the last save wait in the pending lists.
+        self.embedding_matrix = np.empty((0, EMBEDDING_DIMENSION), dtype=np.float32)
+        self.embedding_ids = np.empty(0, dtype=np.int64)
+        self.pending_embeddings: List[np.ndarray] = []
+        self.pending_embedding_ids: List[np.ndarray] = []
+        # Bulk ingestion state: documents waiting to be embedded, and documents
+        # indexed in memory but not yet written to disk (see bulk_ingest)
+        self.ingest_lock = threading.RLock()
+        self._ingest_queue: Optional[Dict[str, Document]] = None
+        self._ingest_unsaved: List[Document] = []
+        has_embeddings = self._load_embeddings()
+        self._migrate_json_store()
         
         # Load or create FAISS index
         if os.path.exists(self.index_path):
             print(f"Loading FAISS index from {self.index_path}")
             self.index = faiss.read_index(self.index_path)
             self._load_documents()
-            for i, doc_id in enumerate(self.documents.keys()):
-                self.doc_id_to_index[doc_id] = i
+            self._load_chunks()
+            self._load_id_map()
+            if not isinstance(self.index, faiss.IndexIDMap2) or not os.path.exists(self.id_map_path):
+                # Index predates stable vector ids (positional or document-level), rebuild it
+                print("Found index without a persisted id map, rebuilding with chunk-level embeddings")
+                self._reindex_all_documents()
+            elif not has_embeddings or len(self.embedding_ids) != self.index.ntotal:
+                # Written before embeddings were persisted, or out of sync after a crash
+                self._export_embeddings_from_index()
+        elif has_embeddings and os.path.exists(self.id_map_path):
+            print("FAISS index missing, rebuilding it from the persisted embeddings")
+            self._load_documents()
+            self._load_chunks()
+            self._load_id_map()
+            self.index = self.rebuild_index_from_embeddings()
+            self._save_index()
         else:
             print("Creating new FAISS index")
-            self.index = faiss.IndexFlatIP(EMBEDDING_DIMENSION)
+            self.index = create_faiss_index()
             self._save_index()
-        
-        self.scan_rag_docs_folder()
+        # RAG_DOCS_DIR is not scanned here; the server scans it in the background
+        # after startup, and /rag/scan triggers it on demand
 
     def pdf_to_text(self, pdf_path: str, timeout: int = 30) -> str:
-        try:
-            import concurrent.futures
-            
-            images = convert_from_path(pdf_path, poppler_path=POPPLER_PATH)
-            
-            text = ""
-            with concurrent.futures.ThreadPoolExecutor() as executor:
-                futures = []
-                for image in images:
-                    future = executor.submit(pytesseract.image_to_string, image)
-                    futures.append(future)
-                
-                for future in concurrent.futures.as_completed(futures, timeout=timeout):
-                    try:
-                        text += future.result()
-                    except concurrent.futures.TimeoutError:
-                        print(f"Timeout processing PDF page: {pdf_path}")
-                        text += "\n[Timeout]\n"
-                    except Exception as e:
-                        print(f"Error processing PDF page: {pdf_path}, {e}")
-                        text += f"\n[Error: {str(e)}]\n"
-            
-            return text.strip()
-        except Exception as e:
-            print(f"Error extracting PDF text: {pdf_path}, {e}")
-            return ""
+        return pdf_to_text(pdf_path, timeout=timeout)
          
     def _generate_document_id(self, content: str, filepath: str = "") -> str:
         """Generate a unique ID for a document based on its content and filepath."""
@@ -142,191 +324,561 @@ class RAGSystem:
             return f"{content_hash}_{filename}"
         return content_hash
     
+    def _migrate_json_store(self):
+        """Move documents and chunks from the old JSON files into SQLite, once."""
+        if not os.path.exists(self.document_path) or not self.document_store.is_empty():
+            return
+        print(f"Migrating {self.document_path} to {self.document_store.db_path}")
+        with open(self.document_path, 'r') as f:
+            doc_dicts = json.load(f)
+        chunks_by_doc: Dict[str, List[Dict[str, Any]]] = {}
+        if os.path.exists(self.chunk_path):
+            with open(self.chunk_path, 'r') as f:
+                for chunk_dict in json.load(f).get("chunks", {}).values():
+                    chunks_by_doc.setdefault(chunk_dict["doc_id"], []).append(Chunk(**chunk_dict).to_dict())
+        with self.document_store.transaction():
+            for doc_id, doc_data in doc_dicts.items():
+                self.document_store.put_document(Document(**doc_data).to_dict(), chunks_by_doc.get(doc_id, []))
+        # Keep the old files around, renamed so the migration doesn't run again
+        for path in [self.document_path, self.chunk_path]:
+            if os.path.exists(path):
+                os.replace(path, path + ".migrated")
+        print(f"Migrated {len(doc_dicts)} documents to {self.document_store.db_path}")
+    
     def _load_documents(self):
-        """Load documents from disk."""
-        if os.path.exists(self.document_path):
-            with open(self.document_path, 'r') as f:
-                doc_dicts = json.load(f)
-                self.documents = {
-                    doc_id: Document(**doc_data)
-                    for doc_id, doc_data in doc_dicts.items()
-                }
-            print(f"Loaded {len(self.documents)} documents from {self.document_path}")
-        else:
-            print(f"No document store found at {self.document_path}")
+        """Load document metadata from the document store; content stays on disk."""
+        self.documents = {
+            doc_dict["id"]: Document(content="", **doc_dict)
+            for doc_dict in self.document_store.load_documents()
+        }
+        print(f"Loaded {len(self.documents)} documents from {self.document_store.db_path}")
             
     def _save_documents(self):
-        """Save documents to disk."""
-        doc_dicts = {
-            doc_id: doc.to_dict()
-            for doc_id, doc in self.documents.items()
-        }
-        with open(self.document_path, 'w') as f:
-            json.dump(doc_dicts, f, indent=2)
-        print(f"Saved {len(self.documents)} documents to {self.document_path}")
+        """Save document metadata (titles, folder status, metadata) to the document store."""
+        self.document_store.update_documents(doc.to_dict() for doc in self.documents.values())
     
-    def _save_index(self):
-        """Save FAISS index to disk."""
-        faiss.write_index(self.index, self.index_path)
-        print(f"Saved FAISS index to {self.index_path}")
+    def _load_chunks(self):
+        """Load chunk spans from the document store."""
+        for chunk_dict in self.document_store.load_chunks():
+            if chunk_dict["doc_id"] in self.documents:
+                self.chunks[chunk_dict["id"]] = Chunk(**chunk_dict)
+        print(f"Loaded {len(self.chunks)} chunks from {self.document_store.db_path}")
     
-    def add_document(self, content: str, title: str = "", original_file: str = "", metadata: Dict[str, Any] = None) -> str:
-        doc_id = self._generate_document_id(content, original_file)
-        
-        # Check if document already exists
-        if doc_id in self.documents:
-            print(f"Document already exists with ID: {doc_id}")
-            
-            # Update the document's in_folder status
-            if original_file:
-                self.documents[doc_id].in_folder = True
-                self.documents[doc_id].last_modified = os.path.getmtime(original_file) if os.path.exists(original_file) else time.time()
-                self._save_documents()
-                
-            return doc_id
-        
-        # Get last modified time if file exists
-        last_modified = os.path.getmtime(original_file) if original_file and os.path.exists(original_file) else time.time()
-        
-        # Create document
-        document = Document(
-            id=doc_id,
-            content=content,
-            title=title or f"Document {len(self.documents) + 1}",
-            original_file=original_file,
-            last_modified=last_modified,
-            in_folder=True,
-            metadata=metadata or {}
+    def _persist_document(self, document: Document):
+        """Write a freshly indexed document and its chunk spans, then release its content."""
+        chunk_ids = [f"{document.id}#{i}" for i in range(document.metadata.get("chunk_count", 0))]
+        self.document_store.put_document(
+            document.to_dict(),
+            [self.chunks[chunk_id].to_dict() for chunk_id in chunk_ids if chunk_id in self.chunks]
         )
+        document.content = ""
+    
+    def _load_manifest(self) -> Dict[str, Dict[str, Any]]:
+        """Load the per-file mtime/size/hash records of the last folder scan."""
+        if not os.path.exists(self.manifest_path):
+            return {}
+        with open(self.manifest_path, 'r') as f:
+            return json.load(f)
+    
+    def _save_manifest(self, manifest: Dict[str, Dict[str, Any]]):
+        """Save the per-file mtime/size/hash records of the folder scan."""
+        with open(self.manifest_path, 'w') as f:
+            json.dump(manifest, f, indent=2)
+    
+    def _load_id_map(self):
+        """Load the FAISS vector id to chunk id mapping stored next to the index."""
+        if not os.path.exists(self.id_map_path):
+            return
+        with open(self.id_map_path, 'r') as f:
+            id_map = json.load(f)
+        self.next_vector_id = id_map.get("next_id", 0)
+        self.tombstones = set(id_map.get("tombstones", []))
+        for vector_id, chunk_id in id_map.get("ids", {}).items():
+            if chunk_id in self.chunks:
+                self.vector_id_to_chunk_id[int(vector_id)] = chunk_id
+                self.chunk_id_to_vector_id[chunk_id] = int(vector_id)
+            else:
+                # Saved with the index but its document never reached the store (interrupted ingest)
+                self.tombstones.add(int(vector_id))
+        print(f"Loaded {len(self.vector_id_to_chunk_id)} vector ids from {self.id_map_path}")
+    
+    def _save_id_map(self):
+        """Save the FAISS vector id to chunk id mapping next to the index."""
+        id_map = {
+            "next_id": self.next_vector_id,
+            "tombstones": sorted(self.tombstones),
+            "ids": {str(vector_id): chunk_id for vector_id, chunk_id in self.vector_id_to_chunk_id.items()}
+        }
+        with open(self.id_map_path + ".tmp", 'w') as f:
+            json.dump(id_map, f)
+        os.replace(self.id_map_path + ".tmp", self.id_map_path)
+    
+    def _index_document_chunks(self, document: Document) -> int:
+        """Split a document into chunks, embed them and add them to the FAISS index."""
+        return self._index_documents_chunks([document])
+    
+    def _index_documents_chunks(self, documents: List[Document]) -> int:
+        """
+        Chunk several documents, embed all of their chunks in batched forward
+        passes and add them to the FAISS index in one call.
+        """
+        chunks = []
+        texts = []
+        for document in documents:
+            spans = self.embedding_model.chunk_text(document.content)
+            document.metadata["chunk_count"] = len(spans)
+            for chunk_index, (start, end) in enumerate(spans):
+                chunks.append(Chunk(
+                    id=f"{document.id}#{chunk_index}",
+                    doc_id=document.id,
+                    chunk_index=chunk_index,
+                    start=start,
+                    end=end,
+                    title=document.title
+                ))
+                texts.append(document.content[start:end])
+        if not chunks:
+            return 0
         
-        # Generate embedding
-        embedding = self.embedding_model.generate_embedding(content)
-        
-        # Normalize embedding for cosine similarity
-        faiss.normalize_L2(np.array([embedding], dtype=np.float32))
+        # Generate and normalize embeddings for cosine similarity
+        embeddings = self.embedding_model.generate_embeddings(texts)
+        faiss.normalize_L2(embeddings)
         
-        # Add to FAISS index
-        self.index.add(np.array([embedding], dtype=np.float32))
+        # Add to FAISS index in one call under freshly allocated vector ids
+        vector_ids = np.arange(self.next_vector_id, self.next_vector_id + len(chunks), dtype=np.int64)
+        self.next_vector_id += len(chunks)
+        with self.index_lock:
+            self.index.add_with_ids(embeddings, vector_ids)
+            self.pending_embeddings.append(embeddings)
+            self.pending_embedding_ids.append(vector_ids)
+            for vector_id, chunk in zip(vector_ids.tolist(), chunks):
+                self.chunks[chunk.id] = chunk
+                self.vector_id_to_chunk_id[vector_id] = chunk.id
+                self.chunk_id_to_vector_id[chunk.id] = vector_id
+            self.corpus_version += 1
         
-        # Update doc_id_to_index mapping
-        self.doc_id_to_index[doc_id] = self.index.ntotal - 1
+        return len(chunks)
+    
+    def _drop_document_chunks(self, document: Document) -> None:
+        """
+        Forget the chunks of a document and tombstone their vectors.
+
+        Tombstoned vectors are skipped at search time and physically removed
+        from the index in one batch once they exceed INDEX_COMPACTION_THRESHOLD.
+        """
+        with self.index_lock:
+            # Chunk ids are derived from the document id, no need to search all chunks
+            for chunk_index in range(document.metadata.get("chunk_count", 0)):
+                chunk_id = f"{document.id}#{chunk_index}"
+                self.chunks.pop(chunk_id, None)
+                vector_id = self.chunk_id_to_vector_id.pop(chunk_id, None)
+                if vector_id is not None:
+                    del self.vector_id_to_chunk_id[vector_id]
+                    self.tombstones.add(vector_id)
+            self.corpus_version += 1
         
-        # Add to document store
-        self.documents[doc_id] = document
+        if self.index.ntotal and len(self.tombstones) / self.index.ntotal > INDEX_COMPACTION_THRESHOLD:
+            self.compact_index()
+    
+    def compact_index(self) -> int:
+        """Remove all tombstoned vectors from the FAISS index. Returns the number removed."""
+        if not self.tombstones:
+            return 0
         
-        # Save to disk
+        with self.index_lock:
+            dead_ids = np.array(sorted(self.tombstones), dtype=np.int64)
+            removed = self.index.remove_ids(dead_ids)
+            matrix, ids = self._collect_embeddings()
+            live = ~np.isin(ids, dead_ids)
+            self.embedding_matrix = np.ascontiguousarray(matrix[live])
+            self.embedding_ids = ids[live]
+            # Reset together with the index change, so searches never see one without the other
+            self.tombstones = set()
+            remaining = self.index.ntotal
+        print(f"Compacted FAISS index: removed {removed} dead vectors, {remaining} remain")
+        return removed
+    
+    def _collect_embeddings(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Fold pending vectors into the embedding matrix and return (matrix, ids)."""
+        if self.pending_embeddings:
+            self.embedding_matrix = np.concatenate([self.embedding_matrix] + self.pending_embeddings)
+            self.embedding_ids = np.concatenate([self.embedding_ids] + self.pending_embedding_ids)
+            self.pending_embeddings = []
+            self.pending_embedding_ids = []
+        return self.embedding_matrix, self.embedding_ids
+    
+    def _reset_embeddings(self) -> None:
+        self.embedding_matrix = np.empty((0, EMBEDDING_DIMENSION), dtype=np.float32)
+        self.embedding_ids = np.empty(0, dtype=np.int64)
+        self.pending_embeddings = []
+        self.pending_embedding_ids = []
+    
+    def _load_embeddings(self) -> bool:
+        """
+        Memory-map the persisted embedding matrix. Returns False if there is
+        none, or if it was produced by a different model or dimension.
+        """
+        paths = [self.embeddings_path, self.embedding_ids_path, self.embeddings_meta_path]
+        if not all(os.path.exists(path) for path in paths):
+            return False
+        try:
+            with open(self.embeddings_meta_path, 'r') as f:
+                meta = json.load(f)
+            if meta.get("model") != EMBEDDING_MODEL or meta.get("dimension") != EMBEDDING_DIMENSION:
+                print(f"Persisted embeddings are from {meta.get('model')} ({meta.get('dimension')}d), ignoring them")
+                return False
+            matrix = np.load(self.embeddings_path, mmap_mode='r')
+            ids = np.load(self.embedding_ids_path)
+        except Exception as e:
+            print(f"Could not load persisted embeddings: {e}")
+            return False
+        if matrix.shape != (len(ids), EMBEDDING_DIMENSION) or matrix.dtype != np.float32:
+            print(f"Persisted embeddings have an unexpected shape {matrix.shape}, ignoring them")
+            return False
+        self.embedding_matrix = matrix
+        self.embedding_ids = ids
+        print(f"Memory-mapped {len(ids)} embeddings from {self.embeddings_path}")
+        return True
+    
+    def _save_embeddings(self) -> None:
+        """Write the embedding matrix, its vector ids and model header; each file replaced atomically."""
+        matrix, ids = self._collect_embeddings()
+        # Drop the memory map first so the file can be replaced on Windows too
+        self.embedding_matrix = matrix = np.array(matrix, dtype=np.float32)
+        for path, array in [(self.embeddings_path, matrix), (self.embedding_ids_path, ids)]:
+            temp_path = path + ".tmp"
+            with open(temp_path, 'wb') as f:
+                np.save(f, array)
+            os.replace(temp_path, path)
+        # Map the new file rather than keep the copy; the vectors already live in the FAISS index
+        self.embedding_matrix = np.load(self.embeddings_path, mmap_mode='r')
+        meta = {"model": EMBEDDING_MODEL, "dimension": EMBEDDING_DIMENSION, "count": int(len(ids)), "normalized": True}
+        with open(self.embeddings_meta_path + ".tmp", 'w') as f:
+            json.dump(meta, f)
+        os.replace(self.embeddings_meta_path + ".tmp", self.embeddings_meta_path)
+    
+    def _export_embeddings_from_index(self) -> None:
+        """Seed the embedding matrix from an existing flat index, so upgrading needs no re-embedding."""
+        flat_index = faiss.downcast_index(self.index.index)
+        if not isinstance(flat_index, faiss.IndexFlat):
+            return
+        print("Exporting embeddings from the existing FAISS index")
+        self.embedding_matrix = flat_index.reconstruct_n(0, self.index.ntotal).astype(np.float32)
+        self.embedding_ids = faiss.vector_to_array(self.index.id_map).astype(np.int64)
+        self._save_embeddings()
+    
+    def rebuild_index_from_embeddings(self, index_factory: str = "") -> faiss.Index:
+        """
+        Build a new FAISS index over the live persisted embeddings without
+        running the embedding model.
+
+        Args:
+            index_factory: Optional faiss.index_factory description (e.g.
+                "IVF256,Flat" or "HNSW32") to change the index type; an exact
+                inner-product index is built by default.
+        """
+        matrix, ids = self._collect_embeddings()
+        live = ~np.isin(ids, np.array(sorted(self.tombstones), dtype=np.int64))
+        vectors = np.ascontiguousarray(matrix[live], dtype=np.float32)
+        if index_factory:
+            index = faiss.IndexIDMap2(faiss.index_factory(EMBEDDING_DIMENSION, index_factory, faiss.METRIC_INNER_PRODUCT))
+            if not index.is_trained:
+                index.train(vectors)
+        else:
+            index = create_faiss_index()
+        if len(vectors):
+            index.add_with_ids(vectors, ids[live])
+        print(f"Rebuilt FAISS index from {len(vectors)} persisted embeddings")
+        return index
+    
+    def _reindex_all_documents(self) -> None:
+        """Rebuild the FAISS index from scratch by re-chunking every stored document."""
+        self.index = create_faiss_index()
+        self._reset_embeddings()
+        self.chunks = {}
+        self.vector_id_to_chunk_id = {}
+        self.chunk_id_to_vector_id = {}
+        self.tombstones = set()
+        self.next_vector_id = 0
+        with self.document_store.transaction():
+            for document in self.documents.values():
+                document.content = self.document_store.get_content(document.id)
+                self._index_document_chunks(document)
+                self._persist_document(document)
         self._save_index()
-        self._save_documents()
+    
+    def _save_index(self):
+        """Save FAISS index to disk, replacing the previous file atomically."""
+        faiss.write_index(self.index, self.index_path + ".tmp")
+        os.replace(self.index_path + ".tmp", self.index_path)
+        self._save_id_map()
+        self._save_embeddings()
+        print(f"Saved FAISS index to {self.index_path}")
+    
+    @contextmanager
+    def bulk_ingest(self):
+        """
+        Group document additions so they are persisted once.
+
+        Inside the block add_document() only queues documents. They are
+        embedded and added to the index INGEST_BATCH_DOCUMENTS at a time, and
+        when the block exits the index, id map and embeddings are saved once
+        and the documents are written to the store in one transaction.
+        Nested blocks join the outermost one.
+
+            with rag_system.bulk_ingest():
+                for path, text in files:
+                    rag_system.add_document(text, original_file=path)
+        """
+        with self.ingest_lock:
+            if self._ingest_queue is not None:
+                yield self
+                return
+            self._ingest_queue = {}
+            try:
+                yield self
+                self._flush_ingest_queue()
+            finally:
+                # Whatever reached the index is persisted, even if ingestion failed part way
+                self._ingest_queue = None
+                self._commit_ingested()
+    
+    def _queue_document(self, document: Document) -> None:
+        self._ingest_queue[document.id] = document
+        if len(self._ingest_queue) >= INGEST_BATCH_DOCUMENTS:
+            self._flush_ingest_queue()
+    
+    def _flush_ingest_queue(self) -> None:
+        """Embed and index the queued documents; their content stays in memory until commit."""
+        documents = list(self._ingest_queue.values())
+        if not documents:
+            return
+        chunk_count = self._index_documents_chunks(documents)
+        for document in documents:
+            self.documents[document.id] = document
+            self._ingest_unsaved.append(document)
+        self._ingest_queue.clear()
+        print(f"Indexed {len(documents)} documents ({chunk_count} chunks)")
+    
+    def _commit_ingested(self) -> None:
+        """Save the index, then write the ingested documents to the store in one transaction."""
+        documents, self._ingest_unsaved = self._ingest_unsaved, []
+        if not documents:
+            return
+        # Index first: vectors without stored chunks are dropped on load, the reverse would be unsearchable
+        self._save_index()
+        with self.document_store.transaction():
+            for document in documents:
+                self._persist_document(document)
+        print(f"Saved {len(documents)} ingested documents to {self.document_store.db_path}")
+    
+    def add_document(self, content: str, title: str = "", original_file: str = "", metadata: Dict[str, Any] = None) -> str:
+        doc_id = self._generate_document_id(content, original_file)
+        
+        with self.bulk_ingest():
+            # Check if document already exists
+            existing = self.documents.get(doc_id) or self._ingest_queue.get(doc_id)
+            if existing:
+                print(f"Document already exists with ID: {doc_id}")
+                
+                # Update the document's in_folder status
+                if original_file:
+                    existing.in_folder = True
+                    existing.last_modified = os.path.getmtime(original_file) if os.path.exists(original_file) else time.time()
+                    if doc_id in self.documents:
+                        self.document_store.update_documents([existing.to_dict()])
+                    
+                return doc_id
+            
+            # Get last modified time if file exists
+            last_modified = os.path.getmtime(original_file) if original_file and os.path.exists(original_file) else time.time()
+            
+            # Create document
+            document = Document(
+                id=doc_id,
+                content=content,
+                title=title or f"Document {len(self.documents) + len(self._ingest_queue) + 1}",
+                original_file=original_file,
+                last_modified=last_modified,
+                in_folder=True,
+                metadata=metadata or {}
+            )
+            
+            # Chunked, embedded and saved with the rest of the batch
+            self._queue_document(document)
         
         print(f"Added document with ID: {doc_id}")
         return doc_id
     
+    def add_documents(self, documents: List[Dict[str, Any]]) -> List[str]:
+        """Add several documents, given as add_document keyword arguments, with a single save."""
+        with self.bulk_ingest():
+            return [self.add_document(**document) for document in documents]
+    
     def scan_rag_docs_folder(self) -> Dict[str, Any]:
+        """
+        Bring the index in line with the RAG docs folder.
+
+        Files are stat'ed first and compared against the scan manifest; only
+        files whose mtime/size changed are hashed, and only files whose content
+        hash changed are extracted, in a process pool.
+        """
         print(f"Scanning: {RAG_DOCS_DIR}")
         if not os.path.exists(RAG_DOCS_DIR):
             os.makedirs(RAG_DOCS_DIR, exist_ok=True)
             print(f"Created directory: {RAG_DOCS_DIR}")
-            return {"added": 0, "updated": 0, "total_docs": 0, "total_in_faiss": 0}
+            return {"added": 0, "updated": 0, "unchanged": 0, "total_docs": 0, "total_in_faiss": 0}
     
-        extensions = ['.txt', '.md', '.csv', '.json', '.html', '.xml', '.py', '.js', '.ts', '.css', '.pdf']
-        print(f"Scanning for files with extensions: {extensions}")
+        print(f"Scanning for files with extensions: {SUPPORTED_EXTENSIONS}")
         files = []
-        for ext in extensions:
+        for ext in SUPPORTED_EXTENSIONS:
             files.extend(Path(RAG_DOCS_DIR).glob(f"*{ext}"))
             
         print(f"Found files: {files}")
     
         added_count = 0
         updated_count = 0
+        unchanged_count = 0
+        
+        manifest = self._load_manifest()
+        doc_id_by_path = {doc.original_file: doc_id for doc_id, doc in self.documents.items()}
         
         for doc_id, doc in self.documents.items():
             if doc.original_file.startswith(RAG_DOCS_DIR):
                 doc.in_folder = False
         
+        # Decide which files need extraction, cheapest checks first
+        changed_files = {}
         for file_path in files:
+            file_path_str = str(file_path)
             try:
-                file_path_str = str(file_path)
-                file_last_modified = os.path.getmtime(file_path_str)
+                stat = os.stat(file_path_str)
+                entry = manifest.get(file_path_str)
+                existing_doc_id = doc_id_by_path.get(file_path_str)
+                # A PDF stored without any chunks came from a failed extraction, never treat it as up to date
+                indexed = existing_doc_id and not (
+                    file_path_str.lower().endswith('.pdf') and not self.documents[existing_doc_id].metadata.get("chunk_count")
+                )
+                
+                if indexed and entry and entry["mtime"] == stat.st_mtime and entry["size"] == stat.st_size:
+                    self.documents[existing_doc_id].in_folder = True
+                    unchanged_count += 1
+                    continue
                 
-                if file_path.suffix.lower() == '.pdf':
-                    content = self.pdf_to_text(file_path_str)
-                else:
-                    with open(file_path_str, 'r', encoding='utf-8') as f:
-                        content = f.read()
+                if indexed and not entry and stat.st_mtime <= self.documents[existing_doc_id].last_modified:
+                    # Indexed before the manifest existed and not modified since
+                    manifest[file_path_str] = {"mtime": stat.st_mtime, "size": stat.st_size, "sha256": file_sha256(file_path_str)}
+                    self.documents[existing_doc_id].in_folder = True
+                    unchanged_count += 1
+                    continue
                 
-                # Check if this file is already in our documents by path
-                existing_doc_id = None
-                for doc_id, doc in self.documents.items():
-                    if doc.original_file == file_path_str:
-                        existing_doc_id = doc_id
-                        break
+                content_hash = file_sha256(file_path_str)
+                if indexed and entry and entry.get("sha256") == content_hash:
+                    # Touched but identical content
+                    manifest[file_path_str] = {"mtime": stat.st_mtime, "size": stat.st_size, "sha256": content_hash}
+                    self.documents[existing_doc_id].in_folder = True
+                    unchanged_count += 1
+                    continue
                 
-                if existing_doc_id:
-                    # Document exists, check if it's been modified
-                    if file_last_modified > self.documents[existing_doc_id].last_modified:
-                        # File has been modified, update the document
-                        if file_path.suffix.lower() == '.pdf':
-                            content = self.pdf_to_text(file_path_str)
-                        else:
-                            with open(file_path_str, 'r', encoding='utf-8') as f:
-                                content = f.read()
-                        
-                        # Generate new embedding
-                        embedding = self.embedding_model.generate_embedding(content)
-                        faiss.normalize_L2(np.array([embedding], dtype=np.float32))
-                        
+                changed_files[file_path_str] = {"mtime": stat.st_mtime, "size": stat.st_size, "sha256": content_hash}
+            except Exception as e:
+                print(f"Error checking file {file_path}: {e}")
+        
+        print(f"{len(changed_files)} new or modified files, {unchanged_count} unchanged")
+        
+        # Changed files are embedded in batches and the index is saved once, at the end
+        with self.bulk_ingest():
+            for file_path_str, content in self._extract_files(list(changed_files.keys())):
+                try:
+                    if content is None:
+                        # Extraction failed: no manifest entry, so the file is retried on the next scan
+                        continue
+                    file_stat = changed_files[file_path_str]
+                    existing_doc_id = doc_id_by_path.get(file_path_str)
+                
+                    if existing_doc_id and existing_doc_id in self.documents:
                         # Update the document content and last_modified
-                        self.documents[existing_doc_id].content = content
-                        self.documents[existing_doc_id].last_modified = file_last_modified
-                        self.documents[existing_doc_id].in_folder = True
-                        
-                        # Update the embedding in FAISS
-                        if existing_doc_id in self.doc_id_to_index:
-                            index_pos = self.doc_id_to_index[existing_doc_id]
-                            # Currently FAISS doesn't support direct update, so we'd need to rebuild the index
-                            # For now, we'll just note that an update is needed
-                            print(f"Document {existing_doc_id} needs embedding update (not supported in current implementation)")
-                        
-                        updated_count += 1
-                    else:
-                        # File hasn't been modified, just mark it as in_folder
-                        self.documents[existing_doc_id].in_folder = True
-                else:
-                    # New document, add it
-                    if file_path.suffix.lower() == '.pdf':
-                        content = self.pdf_to_text(file_path_str)
-                    else:
-                        with open(file_path_str, 'r', encoding='utf-8') as f:
-                            content = f.read()
-                    
-                    # Use filename as title
-                    title = file_path.stem
+                        document = self.documents[existing_doc_id]
+                        document.content = content
+                        document.last_modified = file_stat["mtime"]
+                        document.in_folder = True
                     
-                    # Add document
-                    doc_id = self.add_document(
-                        content=content,
-                        title=title,
-                        original_file=file_path_str,
-                        metadata={"source": file_path_str}
-                    )
+                        # Replace the document's chunks with freshly embedded ones
+                        self._drop_document_chunks(document)
+                        self._queue_document(document)
                     
-                    added_count += 1
-                    print(f"Added document from file: {file_path}")
+                        updated_count += 1
+                    else:
+                        # New document, add it using the filename as title
+                        self.add_document(
+                            content=content,
+                            title=Path(file_path_str).stem,
+                            original_file=file_path_str,
+                            metadata={"source": file_path_str}
+                        )
                     
-            except Exception as e:
-                print(f"Error processing file {file_path}: {e}")
+                        added_count += 1
+                        print(f"Added document from file: {file_path_str}")
+                
+                    manifest[file_path_str] = file_stat
+                except Exception as e:
+                    print(f"Error processing file {file_path_str}: {e}")
+        
+        # Forget manifest entries of files that left the folder
+        present = {str(file_path) for file_path in files}
+        manifest = {path: entry for path, entry in manifest.items() if path in present}
+        
+        # Drop OCR results of PDFs that were replaced or removed
+        ocr_cache = get_ocr_cache()
+        # (failed extractions keep theirs, so the retry only OCRs the missing pages)
+        ocr_cache.purge([
+            entry["sha256"] for path, entry in list(manifest.items()) + list(changed_files.items())
+            if path.lower().endswith('.pdf')
+        ])
         
         # Save the updated document status
+        self._save_manifest(manifest)
         self._save_documents()
         
         # Return stats
         return {
             "added": added_count,
             "updated": updated_count,
+            "unchanged": unchanged_count,
             "total_docs": len(files),
-            "total_in_faiss": len(self.documents)
+            "total_in_faiss": len(self.documents),
+            "ocr_cache": ocr_cache.get_stats()
         }
     
+    def _extract_files(self, file_paths: List[str]):
+        """
+        Yield (file_path, content) pairs, extracting in a process pool when
+        there is more than one file. Content is None if extraction failed.
+        """
+        if len(file_paths) <= 1 or SCAN_WORKERS <= 1:
+            for file_path in file_paths:
+                try:
+                    yield file_path, extract_text(file_path)
+                except Exception as e:
+                    print(f"Error extracting file {file_path}: {e}")
+                    yield file_path, None
+            return
+        
+        # Spawned rather than forked from this threaded process with torch loaded;
+        # document_loader is light to import
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=min(SCAN_WORKERS, len(file_paths)),
+            mp_context=multiprocessing.get_context("spawn")
+        ) as executor:
+            futures = {executor.submit(extract_text, file_path): file_path for file_path in file_paths}
+            for future in concurrent.futures.as_completed(futures):
+                file_path = futures[future]
+                try:
+                    yield file_path, future.result()
+                except Exception as e:
+                    print(f"Error extracting file {file_path}: {e}")
+                    yield file_path, None
+    
     def get_document_list(self) -> List[Dict[str, Any]]:
         document_list = []
         for doc_id, doc in self.documents.items():
@@ -336,6 +888,7 @@ class RAGSystem:
                 "original_file": doc.original_file,
                 "in_folder": doc.in_folder,
                 "in_faiss": True,  # It's in FAISS if it's in self.documents
+                "chunk_count": doc.metadata.get("chunk_count", 0),
                 "last_modified": doc.last_modified
             })
         
@@ -344,26 +897,52 @@ class RAGSystem:
         
         return document_list
         
-    def retrieve(self, query: str, top_k: int = 3) -> List[Tuple[Document, float]]:
+    def embed_query(self, query: str) -> np.ndarray:
+        """Normalized embedding of a query, served from the query cache when it was seen before."""
+        # Case, punctuation and spacing don't get their own embedding; arithmetic operators are spelled out, not dropped
+        normalized = normalize_query(query)
+        embedding = self.query_cache.get(normalized)
+        if embedding is None:
+            embedding = np.array([self.embedding_model.generate_embedding(normalized)], dtype=np.float32)
+            faiss.normalize_L2(embedding)
+            embedding = embedding[0]
+            self.query_cache.put(normalized, embedding)
+        return embedding
+
+    def retrieve(self, query: str, top_k: int = 3) -> List[Tuple[Chunk, float]]:
+        """Return the top_k chunks most similar to the query, best first."""
         if self.index.ntotal == 0:
             print("No documents in index")
             return []
           
-        query_embedding = self.embedding_model.generate_embedding(query)
-        faiss.normalize_L2(np.array([query_embedding], dtype=np.float32))
-        scores, indices = self.index.search(np.array([query_embedding], dtype=np.float32), min(top_k, self.index.ntotal))
-          
-        results = []
-        for i, idx in enumerate(indices[0]):
-            if idx != -1:
-                score = scores[0][i]
-                if score >= SIMILARITY_THRESHOLD:
-                    doc_id = next((did for did, index in self.doc_id_to_index.items() if index == idx), None)
-                    if doc_id and doc_id in self.documents:
-                        results.append((self.documents[doc_id], float(score)))
+        query_embedding = self.embed_query(query).reshape(1, -1)
+        # Over-fetch by the number of dead vectors so they can't crowd out live chunks
+        with self.index_lock:
+            search_k = min(top_k + len(self.tombstones), self.index.ntotal)
+            scores, indices = self.index.search(query_embedding, search_k)
+              
+            results = []
+            for i, idx in enumerate(indices[0]):
+                if idx != -1:
+                    score = scores[0][i]
+                    if score >= SIMILARITY_THRESHOLD:
+                        chunk_id = self.vector_id_to_chunk_id.get(int(idx))
+                        chunk = self.chunks.get(chunk_id) if chunk_id else None
+                        if chunk:
+                            results.append((chunk, float(score)))
           
         results.sort(key=lambda x: x[1], reverse=True)
-        return results
+        results = results[:top_k]
+        # Only the winning chunks have their text read from the document store
+        texts = self.document_store.get_chunk_texts([chunk.id for chunk, _ in results])
+        return [(replace(chunk, content=self._chunk_text(chunk, texts)), score) for chunk, score in results]
+
+    def _chunk_text(self, chunk: Chunk, stored_texts: Dict[str, str]) -> str:
+        document = self.documents.get(chunk.doc_id)
+        if document is not None and document.content:
+            # Ingested but not committed yet; the store may still hold the previous version
+            return document.content[chunk.start:chunk.end]
+        return stored_texts.get(chunk.id, "")
 
     def remove_document(self, doc_id: str) -> bool:
         if doc_id not in self.documents:
@@ -371,57 +950,84 @@ class RAGSystem:
             return False
           
         print(f"Removing document: {doc_id}")
-        del self.documents[doc_id]
-        if doc_id in self.doc_id_to_index:
-            del self.doc_id_to_index[doc_id]
+        self._drop_document_chunks(self.documents.pop(doc_id))
           
-        self._save_documents()
+        self._save_index()
+        self.document_store.delete_document(doc_id)
         return True
 
     def remove_all_documents(self) -> None:
         print("Removing all documents from the RAG system")
         # Reset the index
-        self.index = faiss.IndexFlatIP(EMBEDDING_DIMENSION)
-        self._save_index()
+        self.index = create_faiss_index()
+        self._reset_embeddings()
         
         # Clear document store and mapping
         self.documents = {}
-        self.doc_id_to_index = {}
-        self._save_documents()
+        self.chunks = {}
+        self.vector_id_to_chunk_id = {}
+        self.chunk_id_to_vector_id = {}
+        self.tombstones = set()
+        self.corpus_version += 1
+        self._save_index()
+        self.document_store.delete_all()
         print("All documents removed")
 
-def format_retrieved_context(retrieved_docs: List[Tuple[Document, float]], query: str) -> str:
+def format_retrieved_context(retrieved_chunks: List[Tuple[Chunk, float]], query: str) -> str:
     """
-    Format retrieved documents for context.
+    Format retrieved chunks for context.
+
+    Chunks from the same document are merged in reading order so that
+    overlapping windows are only included once.
 
     Args:
-        retrieved_docs: List of (document, similarity_score)
+        retrieved_chunks: List of (chunk, similarity_score)
         query: Original query
 
     Returns:
         Formatted context string
     """
-    if not retrieved_docs:
+    if not retrieved_chunks:
         return ""
     
+    # Group chunks per document, keeping documents in order of their best score
+    grouped: Dict[str, List[Tuple[Chunk, float]]] = {}
+    for chunk, score in retrieved_chunks:
+        grouped.setdefault(chunk.doc_id, []).append((chunk, score))
+    
     context_parts = ["RELEVANT INFORMATION:"]
 
-    for doc, score in retrieved_docs:
-        content = doc.content[:1000] + "..." if len(doc.content) > 1000 else doc.content
+    for doc_chunks in grouped.values():
+        doc_chunks.sort(key=lambda x: x[0].start)
+        
+        # Merge overlapping or adjacent spans, separate the rest with an ellipsis
+        spans = []
+        span_end = -1
+        for chunk, _ in doc_chunks:
+            if spans and chunk.start <= span_end:
+                if chunk.end > span_end:
+                    spans[-1] += chunk.content[span_end - chunk.start:]
+                    span_end = chunk.end
+            else:
+                spans.append(chunk.content)
+                span_end = chunk.end
         
-        context_parts.append(f"Title: {doc.title}")
-        context_parts.append(f"Relevance: {score:.2f}")
-        context_parts.append(f"Content: {content}")
+        context_parts.append(f"Title: {doc_chunks[0][0].title}")
+        context_parts.append(f"Relevance: {max(score for _, score in doc_chunks):.2f}")
+        context_parts.append(f"Content: {' ... '.join(span.strip() for span in spans)}")
         context_parts.append("-" * 40)
     
     return "\n".join(context_parts)
 
 # Singleton instance
 _rag_system = None
+_rag_system_lock = threading.Lock()
 
 def get_rag_system() -> RAGSystem:
     """Get RAG system singleton instance."""
     global _rag_system
     if _rag_system is None:
-        _rag_system = RAGSystem()
+        with _rag_system_lock:
+            if _rag_system is None:
+                _rag_system = RAGSystem()
     return _rag_system
\ No newline at end of file
@@ -0,0 +1,168 @@
+import os
+import re
+import time
+import uuid
+import threading
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Optional
+
+# Clients identify their conversation with this header, or the cookie set on first contact
+SESSION_HEADER = "X-Session-Id"
+SESSION_COOKIE = "tutor_session"
+SESSION_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{8,128}$")
+
+SESSION_MAX_MESSAGES = int(os.environ.get("SESSION_MAX_MESSAGES", "20"))  # Ring buffer size per session
+SESSION_HISTORY_TOKENS = int(os.environ.get("SESSION_HISTORY_TOKENS", "1500"))  # History sent to the LLM per turn
+SESSION_IDLE_TTL = int(os.environ.get("SESSION_IDLE_TTL", "1800"))  # Seconds
+SESSION_MAX_SESSIONS = int(os.environ.get("SESSION_MAX_SESSIONS", "1000"))
+SUMMARY_MAX_CHARS = 600
+SUMMARY_QUESTION_CHARS = 80
+CHARS_PER_TOKEN = 4  # Rough estimate, close enough for budgeting English text
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 4  # Plus per-message overhead
+
+
+@dataclass
+class ConversationSession:
+    session_id: str
+    messages: Deque[Dict[str, str]] = field(default_factory=lambda: deque(maxlen=SESSION_MAX_MESSAGES))
+    # Short digest of turns that no longer fit in the ring buffer
+    summary: str = ""
+    last_active: float = field(default_factory=time.time)
+
+
+def summarize_messages(messages: List[Dict[str, str]], previous_summary: str = "") -> str:
+    """
+    Cheap extractive summary: the student's earlier questions, newest kept
+    when the summary grows past SUMMARY_MAX_CHARS. Avoids a second LLM call.
+    """
+    questions = [
+        message["content"][:SUMMARY_QUESTION_CHARS].strip()
+        for message in messages if message["role"] == "user"
+    ]
+    summary = "; ".join(part for part in [previous_summary] + questions if part)
+    if len(summary) > SUMMARY_MAX_CHARS:
+        summary = "..." + summary[-SUMMARY_MAX_CHARS:]
+    return summary
+
+
+class SessionStore:
+    """
+    Per-session conversation history.
+
+    Each session keeps its latest SESSION_MAX_MESSAGES messages in a ring
+    buffer; older turns are folded into a short summary. Sessions idle for
+    longer than SESSION_IDLE_TTL are evicted, as are the least recently used
+    ones past SESSION_MAX_SESSIONS.
+    """
+
+    def __init__(self, idle_ttl: int = SESSION_IDLE_TTL, max_sessions: int = SESSION_MAX_SESSIONS):
+        self.idle_ttl = idle_ttl
+        self.max_sessions = max_sessions
+        self.sessions: "OrderedDict[str, ConversationSession]" = OrderedDict()
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def resolve_session_id(header_value: Optional[str], cookie_value: Optional[str]) -> str:
+        """Use the client's session id if it is well formed, otherwise start a new session."""
+        for value in (header_value, cookie_value):
+            if value and SESSION_ID_PATTERN.match(value):
+                return value
+        return uuid.uuid4().hex
+
+    def _get_session(self, session_id: str) -> ConversationSession:
+        session = self.sessions.get(session_id)
+        if session is None:
+            session = ConversationSession(session_id)
+            self.sessions[session_id] = session
+        self.sessions.move_to_end(session_id)
+        session.last_active = time.time()
+        return session
+
+    def _evict(self) -> int:
+        evicted = 0
+        cutoff = time.time() - self.idle_ttl
+        # Sessions are ordered by last activity, so idle ones are at the front
+        while self.sessions:
+            session_id, session = next(iter(self.sessions.items()))
+            if session.last_active >= cutoff and len(self.sessions) <= self.max_sessions:
+                break
+            del self.sessions[session_id]
+            evicted += 1
+        return evicted
+
+    def append_turn(self, session_id: str, user_content: str, assistant_content: str) -> None:
+        with self.lock:
+            session = self._get_session(session_id)
+            new_messages = [{"role": "user", "content": user_content}, {"role": "assistant", "content": assistant_content}]
+            overflow = len(session.messages) + len(new_messages) - SESSION_MAX_MESSAGES
+            if overflow > 0:
+                # These are about to fall off the ring buffer
+                session.summary = summarize_messages(list(session.messages)[:overflow], session.summary)
+            session.messages.extend(new_messages)
+            self._evict()
+
+    def get_history(self, session_id: str, token_budget: int = SESSION_HISTORY_TOKENS) -> List[Dict[str, str]]:
+        """
+        Recent messages to send with the next question, newest turns first to
+        claim the token budget. Anything older is represented by the summary.
+        """
+        with self.lock:
+            session = self.sessions.get(session_id)
+            if session is None:
+                return []
+            # Reading counts as activity; eviction relies on the dict being in recency order
+            session.last_active = time.time()
+            self.sessions.move_to_end(session_id)
+            messages = list(session.messages)
+            summary = session.summary
+
+        kept = []
+        used = estimate_tokens(summary) if summary else 0
+        for message in reversed(messages):
+            cost = estimate_tokens(message["content"])
+            if used + cost > token_budget:
+                break
+            kept.append(message)
+            used += cost
+        kept.reverse()
+        # Never start the history with a dangling assistant reply
+        if kept and kept[0]["role"] == "assistant":
+            kept = kept[1:]
+
+        dropped = messages[:len(messages) - len(kept)]
+        if dropped:
+            summary = summarize_messages(dropped, summary)
+        history = [{"role": "system", "content": f"Earlier in this conversation the student asked: {summary}"}] if summary else []
+        return history + kept
+
+    def clear(self, session_id: str) -> bool:
+        with self.lock:
+            return self.sessions.pop(session_id, None) is not None
+
+    def evict_idle(self) -> int:
+        with self.lock:
+            return self._evict()
+
+    def get_stats(self) -> dict:
+        with self.lock:
+            return {
+                "sessions": len(self.sessions),
+                "messages": sum(len(session.messages) for session in self.sessions.values()),
+                "max_sessions": self.max_sessions,
+                "idle_ttl": self.idle_ttl
+            }
+
+
+# Singleton instance
+_session_store = None
+
+def get_session_store() -> SessionStore:
+    """Get the shared session store."""
+    global _session_store
+    if _session_store is None:
+        _session_store = SessionStore()
+    return _session_store
@@ -1,27 +1,319 @@
-from TTS.api import TTS
-import whisper
 import os
 import sys
-import shutil
+import subprocess
 import re
 import json
+import time
+import hashlib
+import threading
+import uuid
+import queue
+import multiprocessing
+import wave
+from collections import OrderedDict
+from contextlib import contextmanager
+import concurrent.futures
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Tuple
+import numpy as np
+from backend.tts_worker import load_tts_model, synthesize_to_file, warm_up_worker
+from backend.stt_backends import STTBackend, create_stt_backend
 
-TTS_OUTPUT_FILENAME = "current_response.wav"
 TTS_OUTPUT_DIR = "tts_output"
-TTS_OUTPUT_PATH = os.path.join(TTS_OUTPUT_DIR, TTS_OUTPUT_FILENAME)
+TTS_MODEL_NAME = "tts_models/en/ljspeech/glow-tts"
+TTS_CACHE_TTL = int(os.environ.get("TTS_CACHE_TTL", str(7 * 24 * 3600)))  # Seconds since last use before a file expires
+TTS_CACHE_MAX_BYTES = int(os.environ.get("TTS_CACHE_MAX_BYTES", str(200 * 1024 * 1024)))
+# Files used more recently than this are never evicted, so clients can still fetch audio they were just given
+TTS_CACHE_GRACE = int(os.environ.get("TTS_CACHE_GRACE", "300"))  # Seconds
+# Extra phrases to synthesize at startup, separated by "|"
+TTS_WARMUP_PHRASES = [phrase for phrase in os.environ.get("TTS_WARMUP_PHRASES", "").split("|") if phrase.strip()]
+# Worker processes synthesizing sentences in parallel, each with its own Glow-TTS
+# model. 0 synthesizes in this process with a single shared model instead.
+TTS_PROCESSES = int(os.environ.get("TTS_PROCESSES", str(min(4, os.cpu_count() or 1))))
 
-# Initialize Coqui TTS model
-tts_model = TTS(model_name="tts_models/en/ljspeech/glow-tts", progress_bar=False, gpu=False)
+# With TTS_PROCESSES=0 the model is loaded in this process on first use and shared
+tts_model_lock = threading.Lock()
 
-def generate_tts_audio(text: str) -> str:
-    os.makedirs(TTS_OUTPUT_DIR, exist_ok=True)
-    
-    # Remove existing audio file
-    if os.path.exists(TTS_OUTPUT_PATH):
+class TTSAudioCache:
+    """
+    Persistent cache of synthesized audio in TTS_OUTPUT_DIR.
+
+    Files are content-addressed by model and normalized text, so a repeated
+    phrase is a free hit. Recency is kept in the file mtimes, which lets the
+    LRU order survive restarts; files are evicted least recently used first
+    once they exceed the byte budget or go unused for longer than the TTL.
+    Files used within TTS_CACHE_GRACE, or pinned while a request still needs
+    them, are kept even if that leaves the cache over budget for a while.
+    """
+
+    def __init__(self, output_dir: str = TTS_OUTPUT_DIR, ttl: int = TTS_CACHE_TTL, max_bytes: int = TTS_CACHE_MAX_BYTES):
+        self.output_dir = output_dir
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.files = OrderedDict()  # filename -> (last_used, size), least recently used first
+        self.pinned = {}  # filename -> number of requests using it
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(output_dir, exist_ok=True)
+        
+        existing = [entry for entry in os.scandir(output_dir) if entry.is_file() and entry.name.endswith('.wav')]
+        for entry in sorted(existing, key=lambda e: e.stat().st_mtime):
+            stat = entry.stat()
+            self.files[entry.name] = (stat.st_mtime, stat.st_size)
+            self.total_bytes += stat.st_size
+        self.evict()
+
+    def lookup(self, filename: str) -> bool:
+        """Return True and mark the file as used if it is cached, counting a hit or a miss."""
+        path = os.path.join(self.output_dir, filename)
+        with self.lock:
+            if filename in self.files and os.path.exists(path):
+                now = time.time()
+                self.files[filename] = (now, self.files[filename][1])
+                self.files.move_to_end(filename)
+                self.hits += 1
+                hit = True
+            else:
+                self.misses += 1
+                hit = False
+        if hit:
+            try:
+                os.utime(path, (now, now))
+            except OSError:
+                pass
+        return hit
+
+    def add(self, filename: str) -> None:
+        """Record a freshly synthesized file."""
+        size = os.path.getsize(os.path.join(self.output_dir, filename))
+        with self.lock:
+            if filename in self.files:
+                self.total_bytes -= self.files.pop(filename)[1]
+            self.files[filename] = (time.time(), size)
+            self.total_bytes += size
+        self.evict()
+
+    @contextmanager
+    def pin(self, filenames: List[str]):
+        """Protect files from eviction while a request reads them, e.g. sentences awaiting concatenation."""
+        with self.lock:
+            for filename in filenames:
+                self.pinned[filename] = self.pinned.get(filename, 0) + 1
         try:
-            os.remove(TTS_OUTPUT_PATH)
+            yield
+        finally:
+            with self.lock:
+                for filename in filenames:
+                    self.pinned[filename] -= 1
+                    if not self.pinned[filename]:
+                        del self.pinned[filename]
+
+    def evict(self) -> List[str]:
+        """Remove expired files and the least recently used files beyond the byte budget. Returns the removed names."""
+        removed = []
+        now = time.time()
+        with self.lock:
+            for filename, (last_used, size) in list(self.files.items()):
+                if now - last_used <= self.ttl and self.total_bytes <= self.max_bytes:
+                    break
+                if now - last_used < TTS_CACHE_GRACE:
+                    # Everything from here on was used even more recently
+                    break
+                if filename in self.pinned:
+                    continue
+                del self.files[filename]
+                self.total_bytes -= size
+                removed.append(filename)
+        for filename in removed:
+            try:
+                os.remove(os.path.join(self.output_dir, filename))
+            except OSError as e:
+                print(f"Warning: Could not remove old audio file {filename}: {e}")
+        return removed
+
+    def get_stats(self) -> dict:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self.files),
+                "bytes": self.total_bytes,
+                "max_bytes": self.max_bytes
+            }
+
+tts_audio_cache = TTSAudioCache()
+
+def normalize_tts_text(cleaned_text: str) -> str:
+    """Cache key normalization. Glow-TTS lowercases its input, so case doesn't change the audio."""
+    return re.sub(r'\s+', ' ', cleaned_text).strip().lower()
+
+def tts_audio_filename(cleaned_text: str) -> str:
+    """Content-addressed file name, so identical requests share a file and concurrent ones never collide."""
+    digest = hashlib.sha256(f"{TTS_MODEL_NAME}\n{normalize_tts_text(cleaned_text)}".encode('utf-8')).hexdigest()
+    return f"{digest[:32]}.wav"
+
+def warm_up_tts_cache(phrases: List[str]) -> None:
+    """
+    Load the TTS model, then synthesize phrases that are requested constantly
+    so they are served from the cache. The model is loaded explicitly since
+    the phrases are usually cache hits already after the first start.
+    """
+    load_tts_models()
+    for phrase in phrases + TTS_WARMUP_PHRASES:
+        try:
+            generate_tts_audio(phrase)
         except Exception as e:
-            print(f"Warning: Could not remove old audio file: {e}")
+            print(f"Warning: Could not warm up TTS cache for '{phrase}': {e}")
+    print(f"TTS cache warmed up: {tts_audio_cache.get_stats()}")
+
+# Sentence boundaries for incremental synthesis; short sentences are merged with the next one
+SENTENCE_END_PATTERN = re.compile(r'(?<=[.!?])\s+')
+MIN_SENTENCE_CHARS = 20
+
+class SentenceBuffer:
+    """Collects streamed text and hands out complete sentences as soon as they end."""
+
+    def __init__(self, min_chars: int = MIN_SENTENCE_CHARS):
+        self.min_chars = min_chars
+        self.text = ""
+
+    def feed(self, delta: str) -> List[str]:
+        """Add text and return the sentences it completed."""
+        self.text += delta
+        sentences = []
+        start = 0
+        for match in SENTENCE_END_PATTERN.finditer(self.text):
+            sentence = self.text[start:match.start()].strip()
+            if len(sentence) >= self.min_chars:
+                sentences.append(sentence)
+                start = match.end()
+        self.text = self.text[start:]
+        return sentences
+
+    def flush(self) -> List[str]:
+        """Return whatever text is left as a final sentence."""
+        remainder = self.text.strip()
+        self.text = ""
+        return [remainder] if remainder else []
+
+def split_sentences(text: str) -> List[str]:
+    buffer = SentenceBuffer()
+    return buffer.feed(text) + buffer.flush()
+
+# TTS worker process pool, created on first use
+_tts_pool = None
+_tts_pool_lock = threading.Lock()
+
+def get_tts_pool() -> ProcessPoolExecutor:
+    """Get the TTS worker pool; every worker loads its model once at startup."""
+    global _tts_pool
+    if _tts_pool is None:
+        with _tts_pool_lock:
+            if _tts_pool is None:
+                # Spawned, not forked: by now this process runs several threads and
+                # has torch/OpenMP initialized, which forked children can deadlock on
+                _tts_pool = ProcessPoolExecutor(
+                    max_workers=TTS_PROCESSES,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=load_tts_model,
+                    initargs=(TTS_MODEL_NAME,)
+                )
+    return _tts_pool
+
+def load_tts_models() -> None:
+    """Load the model in every TTS worker process, or in this process with TTS_PROCESSES=0."""
+    if TTS_PROCESSES <= 0:
+        with tts_model_lock:
+            load_tts_model(TTS_MODEL_NAME)
+        return
+    pool = get_tts_pool()
+    try:
+        # Submitted together, so workers still loading are busy and each task starts another one
+        futures = [pool.submit(warm_up_worker, TTS_MODEL_NAME) for _ in range(TTS_PROCESSES)]
+        pids = {future.result() for future in futures}
+    except BrokenProcessPool:
+        _reset_tts_pool(pool)
+        raise
+    print(f"TTS model loaded in {len(pids)} worker processes")
+
+def _reset_tts_pool(broken_pool: ProcessPoolExecutor) -> None:
+    """Drop a broken pool so the next get_tts_pool() starts fresh workers."""
+    global _tts_pool
+    with _tts_pool_lock:
+        if _tts_pool is broken_pool:
+            _tts_pool = None
+    broken_pool.shutdown(wait=False, cancel_futures=True)
+
+def shutdown_tts_pool() -> None:
+    global _tts_pool
+    if _tts_pool is not None:
+        _tts_pool.shutdown(cancel_futures=True)
+        _tts_pool = None
+
+def _temp_audio_path(output_path: str) -> str:
+    # Write to a private temp file and rename, so clients never fetch a partial file
+    return f"{output_path}.{uuid.uuid4().hex}.tmp"
+
+def _synthesize_sentences(sentences: List[str], pool: ProcessPoolExecutor = None) -> List[str]:
+    filenames = [tts_audio_filename(sentence) for sentence in sentences]
+    jobs = {}
+    try:
+        for sentence, filename in zip(sentences, filenames):
+            if filename in jobs or tts_audio_cache.lookup(filename):
+                continue
+            output_path = os.path.join(TTS_OUTPUT_DIR, filename)
+            temp_path = _temp_audio_path(output_path)
+            if pool is not None:
+                jobs[filename] = (temp_path, pool.submit(synthesize_to_file, TTS_MODEL_NAME, sentence, temp_path))
+            else:
+                with tts_model_lock:
+                    synthesize_to_file(TTS_MODEL_NAME, sentence, temp_path)
+                jobs[filename] = (temp_path, None)
+        
+        for filename, (temp_path, future) in jobs.items():
+            if future is not None:
+                future.result()
+            os.replace(temp_path, os.path.join(TTS_OUTPUT_DIR, filename))
+            tts_audio_cache.add(filename)
+    except BrokenProcessPool:
+        # No worker is left writing, so half-written files can go
+        for temp_path, _ in jobs.values():
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        raise
+    
+    if jobs:
+        print(f"Synthesized {len(jobs)} of {len(sentences)} sentences")
+    return filenames
+
+def synthesize_sentences(sentences: List[str]) -> List[str]:
+    """Synthesize each sentence into its own cached file and return the file names in order."""
+    pool = get_tts_pool() if TTS_PROCESSES > 0 else None
+    try:
+        return _synthesize_sentences(sentences, pool)
+    except BrokenProcessPool:
+        # A worker died (out of memory, crash), which breaks the whole pool; restart it and retry once
+        print("TTS worker pool is broken, restarting it")
+        _reset_tts_pool(pool)
+        return _synthesize_sentences(sentences, get_tts_pool())
+
+def concatenate_wav_files(input_paths: List[str], output_path: str) -> None:
+    """Join WAV files with identical formats (all come from the same model) into one."""
+    with wave.open(output_path, 'wb') as output:
+        for index, input_path in enumerate(input_paths):
+            with wave.open(input_path, 'rb') as wav_input:
+                if index == 0:
+                    output.setparams(wav_input.getparams())
+                output.writeframes(wav_input.readframes(wav_input.getnframes()))
+
+def generate_tts_audio(text: str) -> str:
+    """Synthesize text and return the name of its audio file in TTS_OUTPUT_DIR."""
+    os.makedirs(TTS_OUTPUT_DIR, exist_ok=True)
     
     cleaned_text = text
     try:
@@ -62,38 +354,233 @@ def generate_tts_audio(text: str) -> str:
     
     print(f"Cleaned text for TTS: {cleaned_text}")
     
-    try:
-        tts_model.tts_to_file(text=cleaned_text, file_path=TTS_OUTPUT_PATH)
-    except UnicodeEncodeError:
-        safe_text = cleaned_text.encode('utf-8', errors='replace').decode('utf-8')
-        tts_model.tts_to_file(text=safe_text, file_path=TTS_OUTPUT_PATH)
+    output_filename = tts_audio_filename(cleaned_text)
+    if tts_audio_cache.lookup(output_filename):
+        print(f"TTS cache hit: {output_filename}")
+        return output_filename
+    
+    # Sentences are synthesized in parallel and cached on their own, so an
+    # answer that repeats a known sentence only synthesizes the new ones
+    sentences = split_sentences(cleaned_text) or [cleaned_text]
+    # Pinned until concatenated, so adding one sentence can't evict another
+    with tts_audio_cache.pin([tts_audio_filename(sentence) for sentence in sentences]):
+        sentence_files = synthesize_sentences(sentences)
+        if len(sentence_files) == 1 and sentence_files[0] == output_filename:
+            return output_filename
+        
+        output_path = os.path.join(TTS_OUTPUT_DIR, output_filename)
+        temp_path = _temp_audio_path(output_path)
+        concatenate_wav_files([os.path.join(TTS_OUTPUT_DIR, filename) for filename in sentence_files], temp_path)
+        os.replace(temp_path, output_path)
     
-    return TTS_OUTPUT_FILENAME
+    tts_audio_cache.add(output_filename)
+    return output_filename
+
+# Whisper works on 16 kHz mono float32 audio
+STT_SAMPLE_RATE = 16000
+FFMPEG_TIMEOUT = 30  # Seconds
+# Transcription batching: clips decoded per forward pass and how long the first one waits for company
+STT_BATCH_SIZE = int(os.environ.get("STT_BATCH_SIZE", "8"))
+STT_BATCH_WINDOW = float(os.environ.get("STT_BATCH_WINDOW", "0.05"))  # Seconds
 
-# Load Whisper STT model
-stt_model = whisper.load_model("base")
+# Energy-based voice activity detection run before transcription
+VAD_FRAME_MS = 30
+VAD_MIN_RMS = float(os.environ.get("VAD_MIN_RMS", "0.01"))  # Frames quieter than this are always silence
+VAD_NOISE_FACTOR = 3.0  # Speech must be this much louder than the clip's noise floor
+VAD_PAD_MS = 200  # Kept around each speech run so word onsets aren't clipped
+VAD_MIN_PAUSE_MS = 500  # Shorter gaps stay inside a speech segment
+VAD_MIN_SPEECH_MS = 250  # Clips with less speech than this are treated as silence
+VAD_MAX_SEGMENT_SECONDS = 30  # Whisper's window; longer recordings are split at pauses
 
+# No longer written; only cleaned up if an older version left it behind
 TEMP_AUDIO_PATH = "temp_audio.wav"
 
-def transcribe_audio(file_path: str) -> str:
-    # Standardize audio file location
-    if file_path != TEMP_AUDIO_PATH:
-        shutil.copy(file_path, TEMP_AUDIO_PATH)
-    
-    result = stt_model.transcribe(TEMP_AUDIO_PATH)
-    transcription_text = result.get("text", "")
-    
-    # Clean up temporary file
-    if file_path != TEMP_AUDIO_PATH and os.path.exists(file_path):
+def decode_audio_bytes(audio_data: bytes, sample_rate: int = STT_SAMPLE_RATE) -> np.ndarray:
+    """
+    Decode an uploaded audio file of any ffmpeg-supported format straight from
+    memory into a mono float32 array, without touching the filesystem.
+    """
+    try:
+        result = subprocess.run(
+            ["ffmpeg", "-nostdin", "-loglevel", "error", "-i", "pipe:0",
+             "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(sample_rate), "pipe:1"],
+            input=audio_data,
+            capture_output=True,
+            timeout=FFMPEG_TIMEOUT,
+            check=True
+        )
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"Failed to decode audio: {e.stderr.decode('utf-8', errors='replace')}") from e
+    return np.frombuffer(result.stdout, np.int16).astype(np.float32) / 32768.0
+
+def detect_speech(audio: np.ndarray, sample_rate: int = STT_SAMPLE_RATE) -> List[Tuple[int, int]]:
+    """
+    Find speech in 16 kHz audio by frame energy.
+
+    Returns padded (start, end) sample ranges, with gaps shorter than
+    VAD_MIN_PAUSE_MS merged. An empty list means the clip is silence.
+    """
+    frame_length = sample_rate * VAD_FRAME_MS // 1000
+    frame_count = len(audio) // frame_length
+    if frame_count == 0:
+        return []
+    frames = audio[:frame_count * frame_length].reshape(frame_count, frame_length)
+    rms = np.sqrt(np.mean(frames ** 2, axis=1))
+    threshold = max(VAD_MIN_RMS, float(np.percentile(rms, 10)) * VAD_NOISE_FACTOR)
+    voiced = np.flatnonzero(rms > threshold)
+    if len(voiced) * VAD_FRAME_MS < VAD_MIN_SPEECH_MS:
+        return []
+
+    # Group voiced frames into runs, bridging short pauses
+    max_gap = VAD_MIN_PAUSE_MS // VAD_FRAME_MS
+    runs = []
+    run_start = run_end = voiced[0]
+    for frame in voiced[1:]:
+        if frame - run_end > max_gap:
+            runs.append((run_start, run_end))
+            run_start = frame
+        run_end = frame
+    runs.append((run_start, run_end))
+
+    pad = sample_rate * VAD_PAD_MS // 1000
+    return [
+        (max(0, start * frame_length - pad), min(len(audio), (end + 1) * frame_length + pad))
+        for start, end in runs
+    ]
+
+def split_speech(audio: np.ndarray, sample_rate: int = STT_SAMPLE_RATE) -> List[np.ndarray]:
+    """
+    Cut the silence out of a clip and split it at pauses into pieces of at
+    most VAD_MAX_SEGMENT_SECONDS of speech, ready for transcription.
+    Returns an empty list for a silence-only clip.
+    """
+    max_samples = sample_rate * VAD_MAX_SEGMENT_SECONDS
+    pieces = []
+    current = []
+    current_samples = 0
+    for start, end in detect_speech(audio, sample_rate):
+        if current and current_samples + end - start > max_samples:
+            pieces.append(np.concatenate(current))
+            current = []
+            current_samples = 0
+        current.append(audio[start:end])
+        current_samples += end - start
+    if current:
+        pieces.append(np.concatenate(current))
+
+    kept = sum(len(piece) for piece in pieces)
+    print(f"VAD kept {kept / sample_rate:.1f}s of {len(audio) / sample_rate:.1f}s audio in {len(pieces)} segments")
+    return pieces
+
+def decode_speech_segments(audio_data: bytes) -> List[np.ndarray]:
+    """Decode an upload and return its speech segments; empty when there is no speech."""
+    return split_speech(decode_audio_bytes(audio_data))
+
+class TranscriptionService:
+    """
+    Batches concurrent transcription requests through one STT backend.
+
+    Requests are queued and a single worker thread collects up to
+    max_batch_size of them, waiting at most max_wait seconds after the first
+    one arrives, and hands them to the backend together (the Whisper backend
+    decodes them in one batched forward pass).
+    """
+
+    def __init__(self, backend: STTBackend, max_batch_size: int = STT_BATCH_SIZE, max_wait: float = STT_BATCH_WINDOW):
+        self.backend = backend
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.requests = queue.Queue()
+        self.stats = {"requests": 0, "batches": 0, "audio_seconds": 0.0, "processing_seconds": 0.0}
+        self.worker = threading.Thread(target=self._run, name="stt-batcher", daemon=True)
+        self.worker.start()
+
+    def submit(self, audio: np.ndarray) -> concurrent.futures.Future:
+        """Queue 16 kHz float32 audio; the future resolves to the transcription text."""
+        future = concurrent.futures.Future()
+        self.requests.put((audio, future))
+        return future
+
+    def transcribe(self, audio: np.ndarray) -> str:
+        return self.submit(audio).result()
+
+    def _collect_batch(self) -> list:
+        batch = [self.requests.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.requests.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = [(audio, future) for audio, future in self._collect_batch() if future.set_running_or_notify_cancel()]
+            if batch:
+                self._process_batch(batch)
+
+    def _process_batch(self, batch: list) -> None:
+        start_time = time.time()
         try:
-            os.remove(file_path)
+            texts = self.backend.transcribe_batch([audio for audio, _ in batch])
+            for (_, future), text in zip(batch, texts):
+                future.set_result(text)
         except Exception as e:
-            print(f"Warning: Could not remove temp audio file: {e}")
-    
+            for _, future in batch:
+                future.set_exception(e)
+
+        elapsed = time.time() - start_time
+        self.stats["requests"] += len(batch)
+        self.stats["batches"] += 1
+        self.stats["audio_seconds"] += sum(len(audio) for audio, _ in batch) / STT_SAMPLE_RATE
+        self.stats["processing_seconds"] += elapsed
+        print(f"Transcribed batch of {len(batch)} clips with {self.backend.name} in {elapsed:.2f}s")
+
+    def get_stats(self) -> dict:
+        stats = dict(self.stats)
+        stats["backend"] = self.backend.name
+        stats["average_batch_size"] = round(stats["requests"] / stats["batches"], 2) if stats["batches"] else 0
+        # Real-time factor: processing time per second of audio
+        stats["real_time_factor"] = round(stats["processing_seconds"] / stats["audio_seconds"], 3) if stats["audio_seconds"] else 0
+        stats["queued"] = self.requests.qsize()
+        return stats
+
+# Singleton instance
+_transcription_service = None
+_transcription_service_lock = threading.Lock()
+
+def get_transcription_service() -> TranscriptionService:
+    """Get the shared transcription service, starting its worker thread on first use."""
+    global _transcription_service
+    if _transcription_service is None:
+        with _transcription_service_lock:
+            if _transcription_service is None:
+                _transcription_service = TranscriptionService(create_stt_backend())
+    return _transcription_service
+
+def log_transcription(transcription_text: str) -> None:
     try:
         print(f"Transcription result: {transcription_text}")
     except UnicodeEncodeError:
         safe_text = transcription_text.encode(sys.stdout.encoding, errors='replace').decode(sys.stdout.encoding)
         print(f"Transcription result (safe print): {safe_text}")
-        
-    return transcription_text
\ No newline at end of file
+
+def transcribe_audio_array(audio: np.ndarray) -> str:
+    # Silence-only clips never reach the model
+    service = get_transcription_service()
+    futures = [service.submit(segment) for segment in split_speech(audio)]
+    transcription_text = " ".join(text for text in (future.result().strip() for future in futures) if text)
+    log_transcription(transcription_text)
+    return transcription_text
+
+def transcribe_audio_bytes(audio_data: bytes) -> str:
+    """Transcribe an uploaded audio file held in memory. Safe to call concurrently."""
+    return transcribe_audio_array(decode_audio_bytes(audio_data))
+
+def transcribe_audio(file_path: str) -> str:
+    with open(file_path, 'rb') as f:
+        return transcribe_audio_bytes(f.read())
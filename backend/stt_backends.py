@@ -0,0 +1,93 @@
+import os
+from typing import List
+import numpy as np
+import torch
+import whisper
+
+# faster-whisper (CTranslate2) is optional; only needed for STT_BACKEND=faster-whisper
+try:
+    from faster_whisper import WhisperModel
+except ImportError:
+    WhisperModel = None
+
+# Speech-to-text engine selection
+STT_BACKEND = os.environ.get("STT_BACKEND", "whisper")  # "whisper" or "faster-whisper"
+STT_MODEL_SIZE = os.environ.get("STT_MODEL_SIZE", "base")
+STT_COMPUTE_TYPE = os.environ.get("STT_COMPUTE_TYPE", "int8")  # faster-whisper quantization
+STT_CPU_THREADS = int(os.environ.get("STT_CPU_THREADS", "0"))  # 0 lets CTranslate2 decide
+STT_BEAM_SIZE = int(os.environ.get("STT_BEAM_SIZE", "1"))  # faster-whisper only
+
+
+class STTBackend:
+    """Speech-to-text engine. All backends take 16 kHz mono float32 audio."""
+
+    name = ""
+
+    def transcribe_batch(self, clips: List[np.ndarray]) -> List[str]:
+        """Transcribe several clips, returning one text per clip in order."""
+        raise NotImplementedError
+
+
+class WhisperBackend(STTBackend):
+    """
+    The PyTorch openai-whisper model in fp32 on CPU.
+
+    Clips within Whisper's 30 second window are decoded in one batched
+    forward pass; longer ones go through the sliding-window transcribe().
+    """
+
+    name = "whisper"
+
+    def __init__(self, model_size: str = STT_MODEL_SIZE):
+        self.model = whisper.load_model(model_size)
+        # Batched decode is greedy; beam search isn't supported for batches
+        self.decoding_options = whisper.DecodingOptions(fp16=self.model.device.type == "cuda")
+
+    def transcribe_batch(self, clips: List[np.ndarray]) -> List[str]:
+        texts = [""] * len(clips)
+        short_indices = []
+        for index, audio in enumerate(clips):
+            if len(audio) <= whisper.audio.N_SAMPLES:
+                short_indices.append(index)
+            else:
+                texts[index] = self.model.transcribe(audio).get("text", "").strip()
+
+        if short_indices:
+            mel = torch.stack([
+                whisper.log_mel_spectrogram(whisper.pad_or_trim(clips[index]), self.model.dims.n_mels)
+                for index in short_indices
+            ]).to(self.model.device)
+            for index, result in zip(short_indices, whisper.decode(self.model, mel, self.decoding_options)):
+                texts[index] = result.text.strip()
+        return texts
+
+
+class FasterWhisperBackend(STTBackend):
+    """Whisper converted to CTranslate2 with int8 weights, usually several times faster on CPU."""
+
+    name = "faster-whisper"
+
+    def __init__(self, model_size: str = STT_MODEL_SIZE, compute_type: str = STT_COMPUTE_TYPE):
+        if WhisperModel is None:
+            raise ImportError("STT_BACKEND=faster-whisper needs the faster-whisper package: pip install faster-whisper")
+        self.model = WhisperModel(model_size, device="cpu", compute_type=compute_type, cpu_threads=STT_CPU_THREADS)
+
+    def transcribe_batch(self, clips: List[np.ndarray]) -> List[str]:
+        texts = []
+        for audio in clips:
+            # Silence is already trimmed before clips get here, so its own VAD stays off
+            segments, _ = self.model.transcribe(audio, beam_size=STT_BEAM_SIZE, vad_filter=False)
+            texts.append(" ".join(segment.text.strip() for segment in segments).strip())
+        return texts
+
+
+STT_BACKENDS = {
+    WhisperBackend.name: WhisperBackend,
+    FasterWhisperBackend.name: FasterWhisperBackend,
+}
+
+def create_stt_backend(name: str = STT_BACKEND, model_size: str = STT_MODEL_SIZE) -> STTBackend:
+    if name not in STT_BACKENDS:
+        raise ValueError(f"Unknown STT backend '{name}', expected one of: {', '.join(STT_BACKENDS)}")
+    print(f"Loading STT backend {name} ({model_size})")
+    return STT_BACKENDS[name](model_size=model_size)
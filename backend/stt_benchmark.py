@@ -0,0 +1,108 @@
+"""
+Compare STT backends on a folder of sample clips.
+
+Every audio file in the folder is paired with a .txt file of the same name
+holding its reference transcript. For each backend the script reports the
+real-time factor (processing time / audio duration, lower is faster) and the
+word error rate against the references.
+
+    python -m backend.stt_benchmark samples/ --backends whisper faster-whisper
+"""
+import argparse
+import os
+import re
+import time
+from typing import List, Tuple
+import numpy as np
+from backend.speech import STT_SAMPLE_RATE, decode_audio_bytes
+from backend.stt_backends import STT_BACKENDS, STT_MODEL_SIZE, create_stt_backend
+
+AUDIO_EXTENSIONS = ['.wav', '.mp3', '.m4a', '.ogg', '.webm', '.flac']
+
+
+def normalize_words(text: str) -> List[str]:
+    return re.sub(r"[^a-z0-9' ]", " ", text.lower()).split()
+
+
+def word_errors(reference: List[str], hypothesis: List[str]) -> int:
+    """Word-level edit distance (substitutions + insertions + deletions)."""
+    previous = list(range(len(hypothesis) + 1))
+    for i, ref_word in enumerate(reference, start=1):
+        current = [i] + [0] * len(hypothesis)
+        for j, hyp_word in enumerate(hypothesis, start=1):
+            current[j] = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (ref_word != hyp_word)
+            )
+        previous = current
+    return previous[-1]
+
+
+def load_samples(folder: str) -> List[Tuple[str, np.ndarray, str]]:
+    samples = []
+    for filename in sorted(os.listdir(folder)):
+        name, extension = os.path.splitext(filename)
+        reference_path = os.path.join(folder, name + ".txt")
+        if extension.lower() not in AUDIO_EXTENSIONS or not os.path.exists(reference_path):
+            continue
+        with open(os.path.join(folder, filename), 'rb') as f:
+            audio = decode_audio_bytes(f.read())
+        with open(reference_path, 'r', encoding='utf-8') as f:
+            samples.append((filename, audio, f.read()))
+    return samples
+
+
+def benchmark_backend(name: str, model_size: str, samples: List[Tuple[str, np.ndarray, str]]) -> dict:
+    backend = create_stt_backend(name, model_size)
+    # One untimed clip so model warm-up doesn't count against the first sample
+    backend.transcribe_batch([samples[0][1]])
+
+    audio_seconds = processing_seconds = 0.0
+    errors = reference_words = 0
+    for filename, audio, reference in samples:
+        start_time = time.perf_counter()
+        hypothesis = backend.transcribe_batch([audio])[0]
+        elapsed = time.perf_counter() - start_time
+
+        reference_tokens = normalize_words(reference)
+        clip_errors = word_errors(reference_tokens, normalize_words(hypothesis))
+        audio_seconds += len(audio) / STT_SAMPLE_RATE
+        processing_seconds += elapsed
+        errors += clip_errors
+        reference_words += len(reference_tokens)
+        print(f"  {filename}: {elapsed:.2f}s, {clip_errors} errors | {hypothesis}")
+
+    return {
+        "backend": name,
+        "clips": len(samples),
+        "audio_seconds": round(audio_seconds, 1),
+        "real_time_factor": round(processing_seconds / audio_seconds, 3) if audio_seconds else 0,
+        "wer": round(errors / reference_words, 3) if reference_words else 0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark STT backends on sample clips with .txt references")
+    parser.add_argument("folder", help="Folder of audio clips and matching .txt transcripts")
+    parser.add_argument("--backends", nargs="+", default=list(STT_BACKENDS), choices=list(STT_BACKENDS))
+    parser.add_argument("--model-size", default=STT_MODEL_SIZE)
+    args = parser.parse_args()
+
+    samples = load_samples(args.folder)
+    if not samples:
+        print(f"No audio clips with .txt references found in {args.folder}")
+        return
+
+    results = []
+    for name in args.backends:
+        print(f"Benchmarking {name} on {len(samples)} clips...")
+        results.append(benchmark_backend(name, args.model_size, samples))
+
+    print(f"\n{'backend':<16}{'clips':>6}{'audio s':>10}{'RTF':>8}{'WER':>8}")
+    for result in results:
+        print(f"{result['backend']:<16}{result['clips']:>6}{result['audio_seconds']:>10}{result['real_time_factor']:>8}{result['wer']:>8}")
+
+
+if __name__ == "__main__":
+    main()
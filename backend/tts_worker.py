@@ -0,0 +1,31 @@
+import os
+from TTS.api import TTS
+
+# Runs inside TTS worker processes, which are spawned fresh and import only
+# what they unpickle: this module, plus the parent's __main__ script when the
+# server is started with "python main.py" (its models load lazily, so that
+# costs imports but no model). Kept separate from speech.py so workers don't
+# build the speech module's caches and services.
+
+_tts_model = None
+
+def load_tts_model(model_name: str) -> TTS:
+    """Load this process's own Glow-TTS instance once."""
+    global _tts_model
+    if _tts_model is None:
+        _tts_model = TTS(model_name=model_name, progress_bar=False, gpu=False)
+    return _tts_model
+
+def warm_up_worker(model_name: str) -> int:
+    """Make sure this worker has its model loaded; returns the worker's pid."""
+    load_tts_model(model_name)
+    return os.getpid()
+
+def synthesize_to_file(model_name: str, text: str, file_path: str) -> str:
+    tts_model = load_tts_model(model_name)
+    try:
+        tts_model.tts_to_file(text=text, file_path=file_path)
+    except UnicodeEncodeError:
+        safe_text = text.encode('utf-8', errors='replace').decode('utf-8')
+        tts_model.tts_to_file(text=safe_text, file_path=file_path)
+    return file_path
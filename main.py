@@ -1,16 +1,23 @@
-from fastapi import FastAPI, UploadFile, File, Form, Body, Request
+from fastapi import FastAPI, UploadFile, File, Form, Body, Request, Response, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
+from fastapi.responses import StreamingResponse, JSONResponse
+from fastapi.encoders import jsonable_encoder
+import asyncio
 import os
-import shutil
+import time
 from typing import Optional, Dict, Any, List
 from pydantic import BaseModel
 import json
 
 # Import backend modules
-from backend.query_model import get_answer_from_text
-from backend.speech import transcribe_audio, generate_tts_audio, TEMP_AUDIO_PATH, TTS_OUTPUT_DIR
+from backend.query_model import get_answer_from_text, stream_answer_from_text
+from backend.speech import decode_speech_segments, get_transcription_service, log_transcription, generate_tts_audio, SentenceBuffer, split_sentences, tts_audio_cache, warm_up_tts_cache, shutdown_tts_pool, TEMP_AUDIO_PATH, TTS_OUTPUT_DIR
 from backend.rag_system import get_rag_system, Document, RAG_DOCS_DIR
+from backend.executors import STT_EXECUTOR, TTS_EXECUTOR, RAG_EXECUTOR, SCAN_EXECUTOR, run_blocking
+from backend.openrouter_client import get_openrouter_client
+from backend.answer_cache import get_answer_cache
+from backend.session_store import get_session_store, SESSION_HEADER, SESSION_COOKIE, SESSION_IDLE_TTL
 
 app = FastAPI()
 
@@ -32,6 +39,60 @@ os.makedirs(WHITEBOARD_DIR, exist_ok=True)
 
 os.makedirs(RAG_DOCS_DIR, exist_ok=True)
 
+# Fixed phrases that are spoken constantly, synthesized once at startup
+GREETING_TEXT = "Hello! I'm your AI tutor. How can I help you today?"
+MODEL_ERROR_EXPLANATION = "I'm sorry, I had trouble processing your request. The OpenRouter API is currently experiencing issues. Please try again later."
+NO_SPEECH_EXPLANATION = "I didn't hear anything. Please try asking your question again."
+FEEDBACK_PHRASES = ["Good job!", "Try again!"]
+
+# Models load lazily; these track the background warm-up started with the server.
+# Values are "pending", "loading", "ready" or "error: ..."
+component_status = {"tts": "pending", "stt": "pending", "embeddings": "pending", "rag_scan": "pending"}
+# Components that must be loaded before /ready reports ready; the scan can finish later
+READINESS_COMPONENTS = ["tts", "stt", "embeddings"]
+warm_up_tasks = []
+
+async def warm_up_component(name: str, executor, func, *args) -> None:
+    component_status[name] = "loading"
+    start_time = time.time()
+    try:
+        await run_blocking(executor, func, *args)
+        component_status[name] = "ready"
+        print(f"Warm-up: {name} ready after {time.time() - start_time:.1f}s")
+    except Exception as e:
+        component_status[name] = f"error: {e}"
+        print(f"Warm-up: {name} failed: {e}")
+
+def load_embedding_model() -> None:
+    get_rag_system().embedding_model.load()
+
+def scan_rag_docs() -> None:
+    result = get_rag_system().scan_rag_docs_folder()
+    print("RAG_docs scan result:", result)
+
+async def warm_up_rag() -> None:
+    await warm_up_component("embeddings", RAG_EXECUTOR, load_embedding_model)
+    await warm_up_component("rag_scan", SCAN_EXECUTOR, scan_rag_docs)
+
+@app.on_event("startup")
+async def start_warm_up():
+    # Everything runs on the worker pools in the background, so the server
+    # accepts connections (and /health answers) right away
+    warm_up_tasks.extend([
+        asyncio.create_task(warm_up_component("tts", TTS_EXECUTOR, warm_up_tts_cache, [GREETING_TEXT, MODEL_ERROR_EXPLANATION, NO_SPEECH_EXPLANATION] + FEEDBACK_PHRASES)),
+        asyncio.create_task(warm_up_component("stt", STT_EXECUTOR, get_transcription_service)),
+        asyncio.create_task(warm_up_rag()),
+    ])
+
+@app.on_event("shutdown")
+async def close_http_clients():
+    # Release pooled keep-alive connections to OpenRouter
+    await get_openrouter_client().aclose()
+
+@app.on_event("shutdown")
+async def stop_tts_workers():
+    shutdown_tts_pool()
+
 # Define request/response models
 class TTSRequest(BaseModel):
     text: str
@@ -50,8 +111,10 @@ class DocumentInfo(BaseModel):
 class ScanResponse(BaseModel):
     added: int
     updated: int
+    unchanged: int = 0
     total_docs: int
     total_in_faiss: int
+    ocr_cache: Dict[str, int] = {}
     
 class RemoveDocumentRequest(BaseModel):
     doc_id: str
@@ -59,30 +122,90 @@ class RemoveDocumentRequest(BaseModel):
 class TextOnlyRequest(BaseModel):
     text: str
 
-# Initialize conversation history
-conversation_history = []
-
+def get_session_id(http_request: Request, http_response: Response) -> str:
+    """Session id from the X-Session-Id header or cookie; new sessions get the cookie set."""
+    cookie_value = http_request.cookies.get(SESSION_COOKIE)
+    session_id = get_session_store().resolve_session_id(http_request.headers.get(SESSION_HEADER), cookie_value)
+    if cookie_value != session_id:
+        http_response.set_cookie(SESSION_COOKIE, session_id, max_age=SESSION_IDLE_TTL, httponly=True, samesite="lax")
+    return session_id
+
+def remember_turn(session_id: str, question: str, response: Any) -> None:
+    """Store a question and the clean explanation of its answer in the session's history."""
+    if isinstance(response, dict) and isinstance(response.get('answer', {}), dict):
+        explanation = response['answer'].get('explanation', '')
+        
+        # Remove any JSON formatting if present
+        if isinstance(explanation, str) and explanation.startswith('{') and explanation.endswith('}'):
+            try:
+                explanation_json = json.loads(explanation)
+                if isinstance(explanation_json, dict) and 'explanation' in explanation_json:
+                    explanation = explanation_json['explanation']
+            except json.JSONDecodeError:
+                pass
+        
+        # Include the final_answer so follow-up questions can refer to it
+        final_answer = response['answer'].get('final_answer', {})
+        if final_answer:
+            explanation = f"{explanation} [ANSWER_INFO: {json.dumps(final_answer)}]"
+        assistant_content = explanation
+    else:
+        assistant_content = str(response)
+    get_session_store().append_turn(session_id, question, assistant_content)
+
+def save_upload(file_path: str, data: bytes) -> None:
+    with open(file_path, "wb") as buffer:
+        buffer.write(data)
+
+async def transcribe_upload(audio_data: bytes) -> str:
+    # Decode and cut out silence on the STT pool, then wait on the batching
+    # transcription service without holding a worker thread, so concurrent
+    # uploads (and the segments of one long upload) can share a batch
+    segments = await run_blocking(STT_EXECUTOR, decode_speech_segments, audio_data)
+    service = get_transcription_service()
+    texts = await asyncio.gather(*(asyncio.wrap_future(service.submit(segment)) for segment in segments))
+    text = " ".join(segment_text.strip() for segment_text in texts if segment_text.strip())
+    log_transcription(text)
+    return text
 
 
 @app.post("/tutor/speak")
-async def tutor_from_audio(file: UploadFile = File(...)):
+async def tutor_from_audio(http_request: Request, http_response: Response, file: UploadFile = File(...)):
+    session_id = get_session_id(http_request, http_response)
     try:
         print("Step 1: Received audio file:", file.filename)
 
-        # Always save to the same temp file path to avoid accumulation
-        with open(TEMP_AUDIO_PATH, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        print(f"Step 2: Saved uploaded audio to {TEMP_AUDIO_PATH}")
+        # The upload is decoded and transcribed in memory, so concurrent requests never share a file
+        audio_data = await file.read()
+        print(f"Step 2: Read {len(audio_data)} bytes of uploaded audio")
 
-        # Transcribe the audio to text
+        # Transcribe the audio to text on the STT worker
         print("Step 3: Starting transcription...")
-        text = transcribe_audio(TEMP_AUDIO_PATH)
+        text = await transcribe_upload(audio_data)
         print("Step 4: Transcription result:", text)
+
+        if not text:
+            print("No speech detected, skipping the model")
+            audio_file = await run_blocking(TTS_EXECUTOR, generate_tts_audio, NO_SPEECH_EXPLANATION)
+            return {
+                "question": "",
+                "answer": {
+                    "explanation": NO_SPEECH_EXPLANATION,
+                    "scene": [],
+                    "final_answer": {
+                        "correct_value": "",
+                        "explanation": "",
+                        "feedback_correct": "",
+                        "feedback_incorrect": ""
+                    }
+                },
+                "audio": f"/tts_output/{audio_file}"
+            }
         
         try:
             # Get a response based on the transcript by passing to query model
             print("Step 5: Sending transcription to OpenRouter API...")
-            response = get_answer_from_text(text)
+            response = await get_answer_from_text(text, get_session_store().get_history(session_id))
             print("Step 6: OpenRouter API response:", response)
             
             # Check if response is a string (error) or the new format
@@ -110,15 +233,15 @@ async def tutor_from_audio(file: UploadFile = File(...)):
                         tts_text = explanation
                     
                     # Use the extracted text for TTS
-                    audio_file = generate_tts_audio(tts_text)
+                    audio_file = await run_blocking(TTS_EXECUTOR, generate_tts_audio, tts_text)
                     
                     # Update the audio path in the response
-                    answer['audio'] = f"/tts_output/{audio_file}?t={os.path.getmtime(os.path.join(TTS_OUTPUT_DIR, audio_file))}"
+                    answer['audio'] = f"/tts_output/{audio_file}"
                 else:
                     # Use the entire response for TTS (fallback for legacy format)
                     tts_text = str(answer)
-                    audio_file = generate_tts_audio(tts_text)
-                    audio_path = f"/tts_output/{audio_file}?t={os.path.getmtime(os.path.join(TTS_OUTPUT_DIR, audio_file))}"
+                    audio_file = await run_blocking(TTS_EXECUTOR, generate_tts_audio, tts_text)
+                    audio_path = f"/tts_output/{audio_file}"
                     
                     # If response was not structured, wrap it
                     if not isinstance(answer, dict):
@@ -138,21 +261,7 @@ async def tutor_from_audio(file: UploadFile = File(...)):
                         }
             
             # Update conversation history
-            conversation_history.append({"role": "user", "content": text})
-            
-            # Extract explanation from structured response if available
-            if isinstance(response, dict) and isinstance(response.get('answer', {}), dict):
-                explanation = response['answer'].get('explanation', '')
-                
-                # Check if there's a final_answer field to include in the conversation history
-                final_answer = response['answer'].get('final_answer', {})
-                if final_answer:
-                    explanation_with_answer = f"{explanation} [ANSWER_INFO: {json.dumps(final_answer)}]"
-                    conversation_history.append({"role": "assistant", "content": explanation_with_answer})
-                else:
-                    conversation_history.append({"role": "assistant", "content": explanation})
-            else:
-                conversation_history.append({"role": "assistant", "content": str(response)})
+            remember_turn(session_id, text, response)
             
             return answer
         
@@ -162,7 +271,7 @@ async def tutor_from_audio(file: UploadFile = File(...)):
                 "error": f"The OpenRouter API encountered an error: {str(model_error)}",
                 "question": text,
                 "answer": {
-                    "explanation": "I'm sorry, I had trouble processing your request. The OpenRouter API is currently experiencing issues. Please try again later.",
+                    "explanation": MODEL_ERROR_EXPLANATION,
                     "scene": [],
                     "final_answer": {
                         "correct_value": "",
@@ -174,8 +283,8 @@ async def tutor_from_audio(file: UploadFile = File(...)):
             }
 
             print("Generating TTS for error message...")
-            audio_file = generate_tts_audio(error_response["answer"]["explanation"])
-            audio_path = f"/tts_output/{audio_file}?t={os.path.getmtime(os.path.join(TTS_OUTPUT_DIR, audio_file))}"
+            audio_file = await run_blocking(TTS_EXECUTOR, generate_tts_audio, error_response["answer"]["explanation"])
+            audio_path = f"/tts_output/{audio_file}"
             error_response["audio"] = audio_path
             print("Error TTS audio at", audio_path)
 
@@ -188,26 +297,56 @@ async def tutor_from_audio(file: UploadFile = File(...)):
 @app.post("/tts")
 async def text_to_speech(request: TTSRequest):
     try:
-        audio_file = generate_tts_audio(request.text)
+        audio_file = await run_blocking(TTS_EXECUTOR, generate_tts_audio, request.text)
         return {
             "message": "Speech generated successfully",
-            "audio": f"/tts_output/{audio_file}?t={os.path.getmtime(os.path.join(TTS_OUTPUT_DIR, audio_file))}"
+            "audio": f"/tts_output/{audio_file}"
         }
     except Exception as e:
         return {"error": str(e)}
 
 
 
+@app.get("/health")
+async def health():
+    # Liveness only; answers while models are still loading
+    return {"status": "ok"}
+
+@app.get("/ready")
+async def readiness():
+    ready = all(component_status[name] == "ready" for name in READINESS_COMPONENTS)
+    return JSONResponse(status_code=200 if ready else 503, content={"ready": ready, "components": component_status})
+
+@app.get("/tts/cache/stats")
+async def tts_cache_stats():
+    return tts_audio_cache.get_stats()
+
+@app.get("/rag/query_cache/stats")
+async def rag_query_cache_stats():
+    rag_system = await run_blocking(RAG_EXECUTOR, get_rag_system)
+    return rag_system.query_cache.get_stats()
+
+@app.get("/answer_cache/stats")
+async def answer_cache_stats():
+    return get_answer_cache().get_stats()
+
+@app.get("/stt/stats")
+async def stt_stats():
+    return get_transcription_service().get_stats()
+
+
+
 # Modified tutor/text endpoint to ensure proper JSON handling
 @app.post("/tutor/text")
-async def tutor_from_text(request: TextOnlyRequest):
+async def tutor_from_text(request: TextOnlyRequest, http_request: Request, http_response: Response):
+    session_id = get_session_id(http_request, http_response)
     try:
         print("Received text input:", request.text)
         
         try:
             # Get a response based on the text by passing to query model
             print("Sending text to OpenRouter API...")
-            response = get_answer_from_text(request.text)
+            response = await get_answer_from_text(request.text, get_session_store().get_history(session_id))
             print("OpenRouter API response:", response)
             
             # Check if response is a string (error) or the structured format
@@ -238,15 +377,15 @@ async def tutor_from_text(request: TextOnlyRequest):
                         tts_text = explanation
                     
                     # Use the extracted text for TTS
-                    audio_file = generate_tts_audio(tts_text)
+                    audio_file = await run_blocking(TTS_EXECUTOR, generate_tts_audio, tts_text)
                     
                     # Update the audio path in the response
-                    answer['audio'] = f"/tts_output/{audio_file}?t={os.path.getmtime(os.path.join(TTS_OUTPUT_DIR, audio_file))}"
+                    answer['audio'] = f"/tts_output/{audio_file}"
                 else:
                     # Use the entire response for TTS (fallback for legacy format)
                     tts_text = str(answer)
-                    audio_file = generate_tts_audio(tts_text)
-                    audio_path = f"/tts_output/{audio_file}?t={os.path.getmtime(os.path.join(TTS_OUTPUT_DIR, audio_file))}"
+                    audio_file = await run_blocking(TTS_EXECUTOR, generate_tts_audio, tts_text)
+                    audio_path = f"/tts_output/{audio_file}"
                     
                     # If response was not structured, wrap it
                     if not isinstance(answer, dict):
@@ -266,30 +405,7 @@ async def tutor_from_text(request: TextOnlyRequest):
                         }
             
             # Update conversation history - store only the clean explanation text
-            conversation_history.append({"role": "user", "content": request.text})
-            
-            # Extract explanation from structured response if available
-            if isinstance(response, dict) and isinstance(response.get('answer', {}), dict):
-                explanation = response['answer'].get('explanation', '')
-                
-                # Remove any JSON formatting if present
-                if isinstance(explanation, str) and explanation.startswith('{') and explanation.endswith('}'):
-                    try:
-                        explanation_json = json.loads(explanation)
-                        if isinstance(explanation_json, dict) and 'explanation' in explanation_json:
-                            explanation = explanation_json['explanation']
-                    except json.JSONDecodeError:
-                        pass
-                
-                # Check if there's a final_answer field to include in the conversation history
-                final_answer = response['answer'].get('final_answer', {})
-                if final_answer:
-                    explanation_with_answer = f"{explanation} [ANSWER_INFO: {json.dumps(final_answer)}]"
-                    conversation_history.append({"role": "assistant", "content": explanation_with_answer})
-                else:
-                    conversation_history.append({"role": "assistant", "content": explanation})
-            else:
-                conversation_history.append({"role": "assistant", "content": str(response)})
+            remember_turn(session_id, request.text, response)
             
             # Make sure we're returning the fully structured response
             if isinstance(answer, dict):
@@ -326,8 +442,8 @@ async def tutor_from_text(request: TextOnlyRequest):
                     else:
                         explanation = str(answer['answer'])
                     
-                    audio_file = generate_tts_audio(explanation)
-                    answer['audio'] = f"/tts_output/{audio_file}?t={os.path.getmtime(os.path.join(TTS_OUTPUT_DIR, audio_file))}"
+                    audio_file = await run_blocking(TTS_EXECUTOR, generate_tts_audio, explanation)
+                    answer['audio'] = f"/tts_output/{audio_file}"
             
             print("Final structured response ready")
             return answer
@@ -338,7 +454,7 @@ async def tutor_from_text(request: TextOnlyRequest):
                 "error": f"The OpenRouter API encountered an error: {str(model_error)}",
                 "question": request.text,
                 "answer": {
-                    "explanation": "I'm sorry, I had trouble processing your request. The OpenRouter API is currently experiencing issues. Please try again later.",
+                    "explanation": MODEL_ERROR_EXPLANATION,
                     "scene": [],
                     "final_answer": {
                         "correct_value": "",
@@ -350,8 +466,8 @@ async def tutor_from_text(request: TextOnlyRequest):
             }
 
             print("Generating TTS for error message...")
-            audio_file = generate_tts_audio(error_response["answer"]["explanation"])
-            audio_path = f"/tts_output/{audio_file}?t={os.path.getmtime(os.path.join(TTS_OUTPUT_DIR, audio_file))}"
+            audio_file = await run_blocking(TTS_EXECUTOR, generate_tts_audio, error_response["answer"]["explanation"])
+            audio_path = f"/tts_output/{audio_file}"
             error_response["audio"] = audio_path
             print("Error TTS audio at", audio_path)
 
@@ -361,17 +477,117 @@ async def tutor_from_text(request: TextOnlyRequest):
         print("Text Processing Error:", e)
         return {"error": str(e)}
 
-    
-    
-    
+
+def sse_event(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(jsonable_encoder(data))}\n\n"
+
+@app.post("/tutor/text/stream")
+async def tutor_from_text_stream(request: TextOnlyRequest, http_request: Request):
+    """
+    Stream a tutoring answer as server-sent events.
+
+    Events: `explanation` (text deltas as the LLM generates them), `audio`
+    (one per sentence, in order, as soon as it is synthesized), `scene` and
+    `final_answer` once the completion ends, and a closing `done` event with
+    the full structured response. `error` is sent instead if the LLM fails.
+    """
+    print("Received streaming text input:", request.text)
+    # Resolve the session before streaming starts; a new session's cookie is
+    # collected on a plain response and copied onto the stream below
+    cookie_response = Response()
+    session_id = get_session_id(http_request, cookie_response)
+    history = get_session_store().get_history(session_id)
+
+    async def event_stream(session_id: str, history: List[Dict[str, str]]):
+        sentences = SentenceBuffer()
+        tts_tasks = []  # (sentence, task) in speaking order
+        next_audio = 0
+
+        async def synthesize(index: int, sentence: str) -> str:
+            audio_file = await run_blocking(TTS_EXECUTOR, generate_tts_audio, sentence)
+            return f"/tts_output/{audio_file}"
+
+        def schedule(new_sentences: List[str]):
+            for sentence in new_sentences:
+                tts_tasks.append((sentence, asyncio.create_task(synthesize(len(tts_tasks), sentence))))
+
+        def audio_event(index: int) -> str:
+            sentence, task = tts_tasks[index]
+            try:
+                return sse_event("audio", {"index": index, "text": sentence, "audio": task.result()})
+            except Exception as e:
+                print(f"Error synthesizing sentence {index}: {e}")
+                return sse_event("audio", {"index": index, "text": sentence, "error": str(e)})
+
+        try:
+            result = None
+            streamed_explanation = False
+            async for kind, value in stream_answer_from_text(request.text, history):
+                if kind == "explanation":
+                    streamed_explanation = True
+                    yield sse_event("explanation", {"text": value})
+                    schedule(sentences.feed(value))
+                    # Push finished audio without waiting on sentences still being synthesized
+                    while next_audio < len(tts_tasks) and tts_tasks[next_audio][1].done():
+                        yield audio_event(next_audio)
+                        next_audio += 1
+                else:
+                    result = value
+
+            if not isinstance(result, dict):
+                yield sse_event("error", {"error": str(result)})
+                return
+
+            if streamed_explanation:
+                schedule(sentences.flush())
+            else:
+                # The completion wasn't JSON, speak the fallback explanation instead
+                schedule(split_sentences(result["answer"]["explanation"]))
+
+            yield sse_event("scene", result["answer"]["scene"])
+            yield sse_event("final_answer", result["answer"]["final_answer"])
+
+            while next_audio < len(tts_tasks):
+                # wait() rather than await, so a failed sentence is reported by audio_event instead of ending the stream
+                await asyncio.wait([tts_tasks[next_audio][1]])
+                yield audio_event(next_audio)
+                next_audio += 1
+
+            # Update conversation history
+            remember_turn(session_id, request.text, result)
+
+            result["audio"] = [task.result() for _, task in tts_tasks if not task.exception()]
+            yield sse_event("done", result)
+        except Exception as e:
+            print("Streaming Tutor Error:", e)
+            yield sse_event("error", {"error": str(e)})
+        finally:
+            for _, task in tts_tasks:
+                task.cancel()
+
+    streaming_response = StreamingResponse(
+        event_stream(session_id, history), media_type="text/event-stream", headers={"Cache-Control": "no-cache"}
+    )
+    for cookie in cookie_response.headers.getlist("set-cookie"):
+        streaming_response.headers.append("set-cookie", cookie)
+    return streaming_response
+
+
+@app.post("/session/reset")
+async def reset_session(http_request: Request, http_response: Response):
+    """Forget the conversation history of the caller's session."""
+    session_id = get_session_id(http_request, http_response)
+    return {"session_id": session_id, "cleared": get_session_store().clear(session_id)}
+
 @app.post("/update_transcript")
-async def update_transcript(request: TranscriptUpdateRequest):
-    # Add to conversation history
-    conversation_history.append({"role": "user", "content": request.transcript})
+async def update_transcript(request: TranscriptUpdateRequest, http_request: Request, http_response: Response):
+    session_id = get_session_id(http_request, http_response)
     
     # Generate a response (optional)
-    response = get_answer_from_text(request.transcript)
-    conversation_history.append({"role": "assistant", "content": response})
+    response = await get_answer_from_text(request.transcript, get_session_store().get_history(session_id))
+    
+    # Add to conversation history
+    remember_turn(session_id, request.transcript, response)
     
     return {
         "status": "success",
@@ -380,14 +596,14 @@ async def update_transcript(request: TranscriptUpdateRequest):
 
 @app.get("/greeting")
 async def get_greeting():
-    greeting = "Hello! I'm your AI tutor. How can I help you today?"
+    greeting = GREETING_TEXT
     
     # Generate TTS for the greeting
-    audio_file = generate_tts_audio(greeting)
+    audio_file = await run_blocking(TTS_EXECUTOR, generate_tts_audio, greeting)
     
     return {
         "greeting": greeting,
-        "audio": f"/tts_output/{audio_file}?t={os.path.getmtime(os.path.join(TTS_OUTPUT_DIR, audio_file))}"
+        "audio": f"/tts_output/{audio_file}"
     }
 
 from backend.query_model import get_answer_from_image_and_prompt
@@ -406,11 +622,11 @@ async def process_whiteboard_image(
         image_data = await request.body()
         
         # Get a response based on the image and prompt
-        response = get_answer_from_image_and_prompt(image_data, prompt)
+        response = await get_answer_from_image_and_prompt(image_data, prompt)
         
         # Generate TTS for the response
-        audio_file = generate_tts_audio(response)
-        audio_path = f"/tts_output/{audio_file}?t={os.path.getmtime(os.path.join(TTS_OUTPUT_DIR, audio_file))}"
+        audio_file = await run_blocking(TTS_EXECUTOR, generate_tts_audio, response)
+        audio_path = f"/tts_output/{audio_file}"
         
         return {
             "response": response,
@@ -421,24 +637,25 @@ async def process_whiteboard_image(
 
 # =============== New RAG System Endpoints ===============
 
-@app.get("/rag/documents", responseModel=List[DocumentInfo])
+@app.get("/rag/documents", response_model=List[DocumentInfo])
 async def get_documents():
     try:
-        rag_system = get_rag_system()
+        rag_system = await run_blocking(RAG_EXECUTOR, get_rag_system)
         return rag_system.get_document_list()
     except Exception as e:
         print(f"Error getting document list: {e}")
-        return {"error": str(e)}
+        # Not a List[DocumentInfo], so it can't go through the response model
+        raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/rag/scan", responseModel=ScanResponse)
+@app.post("/rag/scan", response_model=ScanResponse)
 async def scan_documents():
     try:
-        rag_system = get_rag_system()
-        result = rag_system.scan_rag_docs_folder()
+        rag_system = await run_blocking(RAG_EXECUTOR, get_rag_system)
+        result = await run_blocking(SCAN_EXECUTOR, rag_system.scan_rag_docs_folder)
         return result
     except Exception as e:
         print(f"Error scanning RAG_docs folder: {e}")
-        return {"error": str(e)}
+        raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/rag/upload")
 async def upload_document(file: UploadFile = File(...)):
@@ -446,12 +663,11 @@ async def upload_document(file: UploadFile = File(...)):
         # Save the file to the RAG_docs directory
         file_path = os.path.join(RAG_DOCS_DIR, file.filename)
         
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        await run_blocking(SCAN_EXECUTOR, save_upload, file_path, await file.read())
         
         # Scan the folder to process the new file
-        rag_system = get_rag_system()
-        result = rag_system.scan_rag_docs_folder()
+        rag_system = await run_blocking(RAG_EXECUTOR, get_rag_system)
+        result = await run_blocking(SCAN_EXECUTOR, rag_system.scan_rag_docs_folder)
         
         return {
             "message": f"File uploaded successfully: {file.filename}",
@@ -464,8 +680,8 @@ async def upload_document(file: UploadFile = File(...)):
 @app.post("/rag/remove")
 async def remove_document(request: RemoveDocumentRequest):
     try:
-        rag_system = get_rag_system()
-        success = rag_system.remove_document(request.doc_id)
+        rag_system = await run_blocking(RAG_EXECUTOR, get_rag_system)
+        success = await run_blocking(SCAN_EXECUTOR, rag_system.remove_document, request.doc_id)
         
         if success:
             return {"message": f"Document removed successfully: {request.doc_id}"}
@@ -488,6 +704,12 @@ async def cleanup_temp_files():
         except Exception as e:
             pass
     
+    # Drop conversations nobody has continued within the idle timeout
+    get_session_store().evict_idle()
+    
+    # Evict expired synthesized audio
+    files_cleaned.extend(os.path.join(TTS_OUTPUT_DIR, filename) for filename in tts_audio_cache.evict())
+    
     return {
         "message": "Cleanup completed",
         "files_cleaned": files_cleaned
@@ -508,12 +730,5 @@ if __name__ == "__main__":
     os.environ["OPENROUTER_API_KEY"] = "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"
     print("OpenRouter API key configured")
     
-    # Scan RAG_docs folder on startup
-    try:
-        rag_system = get_rag_system()
-        result = rag_system.scan_rag_docs_folder()
-        print("RAG_docs scan result:", result)
-    except Exception as e:
-        print(f"Error scanning RAG_docs on startup: {e}")
-    
+    # RAG_docs is scanned by the startup warm-up once the server is up
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -2,6 +2,7 @@ import React, { useState, useRef, useEffect } from 'react';
 import { Mic, MicOff, RefreshCw } from 'lucide-react';
 import axios from 'axios';
 import { estimateSpeechDuration } from '../utils/speechTimingUtils';
+import { getSessionId } from '../utils/session';
 import { useTTS, DrawingInstruction } from '../context/TTSContext';
 
 interface SpeechRecognitionProps {
@@ -244,7 +245,8 @@ const SpeechRecognition: React.FC<SpeechRecognitionProps> = ({ onTranscriptUpdat
       const timestamp = new Date().getTime();
       const response = await axios.post<AIResponse>(`http://localhost:8000/tutor/speak?t=${timestamp}`, formData, {
         headers: {
-          'Content-Type': 'multipart/form-data'
+          'Content-Type': 'multipart/form-data',
+          'X-Session-Id': getSessionId()
         }
       });
       
@@ -5,6 +5,7 @@ import { Stage, Layer, Line, Rect, Circle, Text, Image, Ellipse } from 'react-ko
 import { Pencil, Eraser, Square, Circle as CircleIcon, Trash2, Download, Undo, Redo, Wand, Image as ImageIcon, Send } from 'lucide-react';
 import SubtitleDisplay from './SubtitleDisplay';
 import { useTTS } from '../context/TTSContext';
+import { getSessionId } from '../utils/session';
 
 interface ToolButtonProps {
   onClick: () => void;
@@ -507,6 +508,7 @@ const Whiteboard: React.FC<WhiteboardProps> = ({ initialPrompt = "" }) => {
           method: 'POST',
           headers: {
             'Content-Type': 'application/json',
+            'X-Session-Id': getSessionId(),
           },
           body: JSON.stringify({ text: prompt })
         });
@@ -0,0 +1,23 @@
+/**
+ * Conversation session id
+ *
+ * The backend keeps conversation history per session, identified by the
+ * X-Session-Id header. The id lives in sessionStorage so each browser tab
+ * holds its own conversation.
+ */
+
+const SESSION_STORAGE_KEY = 'tutorSessionId';
+
+/**
+ * Returns this tab's session id, creating one on first use.
+ *
+ * @returns Session id sent with every tutoring request
+ */
+export const getSessionId = (): string => {
+    let sessionId = sessionStorage.getItem(SESSION_STORAGE_KEY);
+    if (!sessionId) {
+        sessionId = crypto.randomUUID().replace(/-/g, '');
+        sessionStorage.setItem(SESSION_STORAGE_KEY, sessionId);
+    }
+    return sessionId;
+};